@@ -0,0 +1,101 @@
+import math
+import re
+
+import numpy as np
+
+# Amenity phrases are reduced to a concept so that listings written as
+# "Lift(s)", "Lifts" or "High Speed Elevators" and a request for "elevator"
+# all meet. A phrase belongs to the first concept with a cue whose words all
+# appear in it; anything else is its own concept.
+AMENITY_SYNONYMS = [
+    ("swimming pool", [{"pool"}]),
+    ("gym", [{"gym"}, {"gymnasium"}, {"fitness"}]),
+    ("lift", [{"lift"}, {"lifts"}, {"elevator"}, {"elevators"}]),
+    ("parking", [{"parking"}, {"garage"}]),
+    ("power backup", [{"power", "backup"}, {"power", "back", "up"}, {"generator"}]),
+    ("security", [{"security"}, {"cctv"}, {"cameras"}, {"guard"}]),
+    ("club house", [{"club"}, {"clubhouse"}, {"community", "center"}]),
+    ("play area", [{"play"}, {"creche"}]),
+    ("piped gas", [{"gas"}]),
+    ("vastu compliant", [{"vastu"}, {"vaastu"}]),
+    ("wheelchair friendly", [{"wheelchair"}, {"wheel", "chair"}]),
+    ("pet friendly", [{"pet"}, {"pets"}]),
+    ("air conditioning", [{"air", "conditioned"}, {"air", "conditioning"}, {"ac"}]),
+    ("internet", [{"internet"}, {"wifi"}, {"wi", "fi"}]),
+    ("intercom", [{"intercom"}]),
+    ("garden", [{"garden"}, {"park"}, {"landscape"}]),
+    ("gated community", [{"gated"}]),
+    ("water purifier", [{"purifier"}, {"ro"}]),
+    ("water supply", [{"water", "supply"}, {"24", "water"}]),
+    ("rain water harvesting", [{"harvesting"}]),
+    ("maintenance staff", [{"maintenance"}]),
+    ("furnished", [{"furnished"}]),
+    ("metro", [{"metro"}]),
+]
+
+
+def amenity_words(phrase):
+    return re.sub(r"[^a-z0-9]+", " ", phrase.lower()).split()
+
+
+def amenity_concept(phrase):
+    """Maps an amenity phrase to its concept name."""
+    words = amenity_words(phrase)
+    present = set(words)
+    for concept, cues in AMENITY_SYNONYMS:
+        if any(cue <= present for cue in cues):
+            return concept
+    return " ".join(words)
+
+
+class AmenityBitsetRanker:
+    """
+    Exact amenity ranking over packed bitsets. Each listing's amenities are
+    mapped to concepts and stored as bits; a query is one bitmask, and
+    candidates are scored by the IDF-weighted overlap with it, normalized by
+    the listing's own weight as a cosine would. Ties, including queries with
+    no known amenities, prefer listings with fewer amenities, which matches
+    the TF-IDF ranking's preference for short amenity lists.
+    """
+
+    def __init__(self, listings):
+        concepts = [amenity_concept(term) for term in listings.vocabulary]
+        self.concepts = sorted(set(concepts))
+        self.concept_ids = {concept: i for i, concept in enumerate(self.concepts)}
+        term_concepts = np.zeros((len(listings.vocabulary), len(self.concepts)), dtype=bool)
+        term_concepts[
+            np.arange(len(concepts)), [self.concept_ids[c] for c in concepts]
+        ] = True
+
+        matrix = (listings.amenity_matrix().astype("uint8") @ term_concepts) > 0
+        self.bits = np.packbits(matrix, axis=1)
+        document_frequency = matrix.sum(axis=0)
+        n = len(listings)
+        self.idf = np.array(
+            [math.log((1 + n) / (1 + f)) + 1 for f in document_frequency], dtype="float32"
+        )
+        self.norms = np.sqrt(matrix.astype("float32") @ (self.idf * self.idf))
+        self.norms[self.norms == 0] = 1.0
+
+    def query_mask(self, user_amenities):
+        """Returns the packed bitmask of the requested amenities that any listing has."""
+        mask = np.zeros(len(self.concepts), dtype=bool)
+        for amenity in user_amenities or []:
+            concept_id = self.concept_ids.get(amenity_concept(amenity))
+            if concept_id is not None:
+                mask[concept_id] = True
+        return np.packbits(mask)
+
+    def scores(self, candidates, user_amenities):
+        overlap = np.bitwise_and(self.bits[candidates], self.query_mask(user_amenities))
+        matched = np.unpackbits(overlap, axis=1, count=len(self.concepts))
+        return (matched @ self.idf) / self.norms[candidates]
+
+    def rank(self, candidates, user_amenities, k=10):
+        """Returns up to k candidate row positions, best match first."""
+        if len(candidates) == 0:
+            return np.empty(0, dtype="int64")
+        candidates = np.asarray(candidates, dtype="int64")
+        scores = self.scores(candidates, user_amenities)
+        order = np.lexsort((self.norms[candidates], -scores))[:k]
+        return candidates[order]
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+class ArtifactCache:
+    """
+    Directory of generated files keyed by (SHA-256 of the input, variant).
+    Files are written atomically, reads refresh the file's mtime, and eviction
+    drops entries not used within max_age seconds and then the least recently
+    used ones until the directory is under max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=1 << 30, max_age=7 * 24 * 3600, suffix=".pdf"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, content_hash, variant):
+        return os.path.join(self.root, f"{content_hash}_{variant}{self.suffix}")
+
+    def get(self, content_hash, variant):
+        """Returns the cached file's path, or None if there is no fresh entry."""
+        path = self.path(content_hash, variant)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, content_hash, variant, source_path):
+        """Copies source_path into the cache atomically and returns the cached path."""
+        path = self.path(content_hash, variant)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as dst, open(source_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Removes expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
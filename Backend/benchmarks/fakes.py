@@ -0,0 +1,318 @@
+"""
+Local stand-ins for the external services the backend calls: Gemini (the
+keyword model, translation and Live sessions), Google Translate, Azure
+text-to-speech, Twilio and Resend. Each one sleeps for a configurable
+latency and returns a plausible result, so load tests exercise the
+backend's own queues, caches and pools without network access or API keys.
+MongoDB needs no fake: MONGO_URI=memory:// selects the in-process user store.
+
+install() must run before main, retrieval or translation are imported.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import types
+
+# Simulated service latencies in seconds, scaled by install()
+LATENCY = {
+    "keywords": 0.4,
+    "translate": 0.15,
+    "google_translate": 0.05,
+    "tts_first_chunk": 0.12,
+    "tts_chunk": 0.01,
+    "live_connect": 0.3,
+    "live_transcript": 0.2,
+    "whatsapp": 0.1,
+    "email": 0.2,
+}
+
+latency_scale = 1.0
+
+# Calls made to each fake, reported by the load test
+calls = {}
+_calls_lock = threading.Lock()
+
+
+def _record(service):
+    with _calls_lock:
+        calls[service] = calls.get(service, 0) + 1
+
+
+def _delay(name):
+    return LATENCY[name] * latency_scale
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def fake_keywords(prompt):
+    """
+    Pulls requirements out of a keyword prompt the way the model would.
+    Written as a Python dict literal, which is what parse_keyword_response
+    evaluates; JSON's null would not be.
+    """
+    match = re.search(r'Text: "(.*)"', prompt, re.DOTALL)
+    text = (match.group(1) if match else prompt).lower()
+    size = re.search(r"(\d)\s*bhk", text)
+    price = re.search(r"(\d[\d,]{3,})", text)
+    location = re.search(r"\bin ([^,.]+?)(?: within| under| with| for|,|\.|$)", text)
+    amenities = re.search(r"\bwith (.+?)(?: within| under|\.|$)", text)
+    return repr(
+        {
+            "size": int(size.group(1)) if size else None,
+            "price": int(price.group(1).replace(",", "")) if price else None,
+            "location": location.group(1).strip() if location else None,
+            "amenities": [a.strip() for a in re.split(r",| and ", amenities.group(1))]
+            if amenities
+            else [],
+        }
+    )
+
+
+class FakeGenerativeModel:
+    """google.generativeai.GenerativeModel"""
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        _record("gemini_keywords")
+        time.sleep(_delay("keywords"))
+        return FakeResponse(fake_keywords(prompt))
+
+    async def generate_content_async(self, prompt):
+        _record("gemini_keywords")
+        await asyncio.sleep(_delay("keywords"))
+        return FakeResponse(fake_keywords(prompt))
+
+
+class FakeGenAIModels:
+    def generate_content(self, model, contents):
+        _record("gemini_translate")
+        time.sleep(_delay("translate"))
+        return FakeResponse("[translated] " + contents.rsplit(": ", 1)[-1])
+
+
+class FakeGenAIClient:
+    """google.genai.Client"""
+
+    def __init__(self, api_key=None, **kwargs):
+        self.models = FakeGenAIModels()
+
+
+class FakeGoogleTranslator:
+    """deep_translator.GoogleTranslator"""
+
+    def __init__(self, source="auto", target="en"):
+        self.source = source
+        self.target = target
+
+    def translate(self, text):
+        _record("google_translate")
+        time.sleep(_delay("google_translate"))
+        return f"[{self.target}] {text}"
+
+    def translate_batch(self, texts):
+        _record("google_translate")
+        time.sleep(_delay("google_translate"))
+        return [f"[{self.target}] {text}" for text in texts]
+
+
+class FakeMessages:
+    def create(self, **kwargs):
+        _record("twilio")
+        time.sleep(_delay("whatsapp"))
+        return types.SimpleNamespace(sid="SM" + "0" * 32, status="queued")
+
+
+class FakeTwilioClient:
+    """twilio.rest.Client"""
+
+    def __init__(self, account_sid=None, auth_token=None, **kwargs):
+        self.messages = FakeMessages()
+
+
+class FakeEmails:
+    """resend.Emails"""
+
+    SendParams = dict
+    sent_bytes = 0
+
+    @classmethod
+    def send(cls, params):
+        _record("resend")
+        time.sleep(_delay("email"))
+        for attachment in params.get("attachments", []):
+            cls.sent_bytes += len(attachment["content"])
+        return {"id": "fake-email"}
+
+
+class FakeTTSService:
+    """
+    Replaces tts_service.TTSService (whose Azure stream fills SDK-owned
+    buffers in place). Yields 100 ms PCM chunks of silence, about 60 ms of
+    audio per character, after a first-chunk delay.
+    """
+
+    def __init__(self, chunk_size=4800):
+        self.chunk_size = chunk_size
+
+    async def stream(self, text, language, gender="Male"):
+        _record("tts")
+        await asyncio.sleep(_delay("tts_first_chunk"))
+        remaining = len(text) * 2880
+        while remaining > 0:
+            size = min(self.chunk_size, remaining)
+            remaining -= size
+            yield bytes(size)
+            await asyncio.sleep(_delay("tts_chunk"))
+
+    async def synthesize(self, text, language, gender="Male"):
+        audio = bytearray()
+        async for chunk in self.stream(text, language, gender):
+            audio += chunk
+        return bytes(audio) or None
+
+
+# What a speaker "says" in load tests, one utterance per burst of audio
+UTTERANCES = [
+    "I am looking for a two bedroom flat near the metro station.",
+    "The budget is around fifty thousand rupees a month, and we need parking for two cars.",
+    "Does the building have a gym, a swimming pool and power backup?",
+    "We would like to visit this weekend if the owner is available.",
+]
+
+
+class FakeGeminiConnection:
+    """
+    gemini_live.GeminiConnection. Counts the audio it is sent and, after
+    every utterance_bytes of it, answers with an utterance split into
+    streamed text parts followed by turnComplete.
+    """
+
+    def __init__(self, utterance_bytes=64000, part_words=4):
+        self.config = None
+        self.closing = False
+        self.reconnects = 0
+        self.utterance_bytes = utterance_bytes
+        self.part_words = part_words
+        self.received_bytes = 0
+        self._pending = 0
+        self._turns = 0
+        self._open = False
+        self._responses = asyncio.Queue()
+        self._tasks = set()
+
+    async def connect(self):
+        if not self.config:
+            raise ValueError("Configuration must be set before connecting")
+        _record("gemini_live_connect")
+        await asyncio.sleep(_delay("live_connect"))
+        self.closing = False
+        self._open = True
+        return json.dumps({"setupComplete": {}})
+
+    def set_config(self, config):
+        self.config = config
+
+    def is_open(self):
+        return self._open
+
+    async def ping(self, timeout=10):
+        return self._open
+
+    async def _respond(self, text):
+        await asyncio.sleep(_delay("live_transcript"))
+        words = text.split()
+        for i in range(0, len(words), self.part_words):
+            part = " ".join(words[i : i + self.part_words])
+            if i:
+                part = " " + part
+            self._responses.put_nowait(
+                json.dumps({"serverContent": {"modelTurn": {"parts": [{"text": part}]}}})
+            )
+            await asyncio.sleep(0.05)
+        self._responses.put_nowait(json.dumps({"serverContent": {"turnComplete": True}}))
+
+    def _start_response(self, text):
+        task = asyncio.create_task(self._respond(text))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def send_audio_bytes(self, pcm):
+        if not self._open:
+            raise ConnectionError("Session is closed")
+        self.received_bytes += len(pcm)
+        self._pending += len(pcm)
+        if self._pending >= self.utterance_bytes:
+            self._pending = 0
+            self._start_response(UTTERANCES[self._turns % len(UTTERANCES)])
+            self._turns += 1
+
+    async def send_audio(self, audio_data: str):
+        # Base64 is four characters per three bytes
+        await self.send_audio_bytes(bytes(len(audio_data) * 3 // 4))
+
+    async def send_image(self, image_data: str):
+        pass
+
+    async def send_image_bytes(self, image):
+        pass
+
+    async def send_text(self, text: str):
+        self._start_response(text)
+
+    async def receive(self):
+        message = await self._responses.get()
+        if message is None:
+            raise ConnectionError("Session is closed")
+        return message
+
+    async def close(self):
+        self.closing = True
+        self._open = False
+        for task in list(self._tasks):
+            task.cancel()
+        # Wakes a pending receive, as closing the real socket would
+        self._responses.put_nowait(None)
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install(scale=1.0):
+    """Registers the fake modules in sys.modules and scales every simulated latency."""
+    global latency_scale
+    latency_scale = scale
+
+    google = sys.modules.get("google") or _module("google", __path__=[])
+    google.generativeai = _module(
+        "google.generativeai",
+        configure=lambda **kwargs: None,
+        GenerativeModel=FakeGenerativeModel,
+    )
+    google.genai = _module("google.genai", Client=FakeGenAIClient)
+    _module("deep_translator", GoogleTranslator=FakeGoogleTranslator)
+
+    twilio = _module("twilio", __path__=[])
+    twilio.rest = _module("twilio.rest", Client=FakeTwilioClient)
+    _module("resend", api_key=None, Emails=FakeEmails)
+
+    # Enough of the Speech SDK for tts_service to import; FakeTTSService does the work
+    azure = _module("azure", __path__=[])
+    azure.cognitiveservices = _module("azure.cognitiveservices", __path__=[])
+    azure.cognitiveservices.speech = _module(
+        "azure.cognitiveservices.speech",
+        SpeechSynthesisOutputFormat=types.SimpleNamespace(Raw24Khz16BitMonoPcm=None),
+        ResultReason=types.SimpleNamespace(Canceled="Canceled", Completed="Completed"),
+    )
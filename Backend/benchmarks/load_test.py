@@ -0,0 +1,466 @@
+"""
+Load test of the backend in-process with the external services replaced by
+the fakes in benchmarks/fakes.py. Starts the app under uvicorn on a
+synthetic listing table in a scratch directory, then drives /properties,
+/upload (following each job to completion), /register and live calls over
+/ws/{client_id} at the same time, and reports per-endpoint latency,
+throughput and errors along with the server's /metrics. Needs the packages
+in requirements-dev.txt; run from Backend/:
+
+    python -m benchmarks.load_test --listings 20000 --searches 500 --calls 8 --output load.json
+
+Calls are a speaker and a listener in another language per room; the
+speaker streams binary PCM frames in real time and the listener's
+first_audio_ms is the time from the speaker's transcript segment to the
+first translated audio frame.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.ranking_engines import latency_stats, sample_queries
+from benchmarks.retrieval_scaling import rss_bytes
+from benchmarks.synthetic import build_synthetic_db, load_templates
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 100 ms of 16 kHz 16-bit mono PCM, the rate the frontend records at
+MIC_CHUNK_BYTES = 3200
+
+
+class Recorder:
+    """Latencies and failures of one endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.started = None
+        self.finished = None
+
+    def error(self, reason):
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    @contextlib.asynccontextmanager
+    async def timed(self):
+        start = time.perf_counter()
+        self.started = self.started or start
+        yield
+        self.finished = time.perf_counter()
+        self.latencies.append(self.finished - start)
+
+    def report(self):
+        report = latency_stats(self.latencies) if self.latencies else {"count": 0}
+        # Requests completed per second of wall time, as opposed to per second of latency
+        if self.latencies and self.finished > self.started:
+            report["throughput_qps"] = len(self.latencies) / (self.finished - self.started)
+        report["errors"] = self.errors
+        return report
+
+
+async def run_concurrent(count, concurrency, request):
+    """Runs request(i) for i in range(count) with at most concurrency in flight."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with limit:
+            await request(i)
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+
+
+def search_transcripts(engine, count, seed):
+    """
+    Transcripts built from listings in the table. About half name amenities,
+    which the rule parser leaves to the (fake) keyword model.
+    """
+    rng = random.Random(seed)
+    transcripts = []
+    for q in sample_queries(engine, count, seed):
+        price = int(q["price"])
+        if rng.random() < 0.5 or not q["amenities"]:
+            transcripts.append(f"Looking for a {q['size']}BHK in {q['location']} under {price}")
+        else:
+            transcripts.append(
+                f"Need a {q['size']} BHK in {q['location']} within {price} "
+                f"with {' and '.join(a.lower() for a in q['amenities'])}"
+            )
+    return transcripts
+
+
+async def load_properties(client, transcripts, concurrency, rankings, semantic):
+    recorder = Recorder()
+
+    async def request(i):
+        body = {"transcript": transcripts[i], "ranking": rankings[i % len(rankings)]}
+        if semantic:
+            body["semantic"] = True
+        try:
+            async with recorder.timed():
+                response = await client.post("/properties", json=body)
+            response.raise_for_status()
+        except Exception as e:
+            recorder.error(type(e).__name__)
+
+    await run_concurrent(len(transcripts), concurrency, request)
+    return recorder.report()
+
+
+def make_pdf(index, pages):
+    """A text-only PDF whose content differs per index, so each upload misses the translated PDF cache."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        for line in range(20):
+            page.insert_text(
+                (72, 72 + line * 30),
+                f"Clause {page_number}.{line} of agreement {index}: the tenant pays rent monthly.",
+                fontsize=10,
+            )
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def load_uploads(client, count, concurrency, pages, language, poll_interval=0.1):
+    """Uploads PDFs and polls each job until it finishes; reports upload latency and time to completion."""
+    uploads = Recorder()
+    jobs = Recorder()
+    statuses = {}
+    documents = await asyncio.to_thread(lambda: [make_pdf(i, pages) for i in range(count)])
+
+    async def request(i):
+        try:
+            async with uploads.timed():
+                response = await client.post(
+                    "/upload",
+                    files={"file": (f"agreement_{i}.pdf", documents[i], "application/pdf")},
+                    data={"language": language, "email": f"tenant{i}@example.com"},
+                )
+            response.raise_for_status()
+            body = response.json()
+            if not body.get("success"):
+                uploads.error(body.get("error", "rejected"))
+                return
+            async with jobs.timed():
+                while True:
+                    job = (await client.get(f"/jobs/{body['job_id']}")).json()
+                    if job["status"] in ("done", "failed"):
+                        break
+                    await asyncio.sleep(poll_interval)
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+            if job["status"] == "failed":
+                jobs.error(job["error"] or "failed")
+        except Exception as e:
+            uploads.error(type(e).__name__)
+
+    await run_concurrent(count, concurrency, request)
+    return {"upload": uploads.report(), "job_completion": jobs.report(), "jobs": statuses}
+
+
+async def load_register(client, count, concurrency):
+    recorder = Recorder()
+
+    async def request(i):
+        try:
+            async with recorder.timed():
+                response = await client.post(
+                    "/register",
+                    params={
+                        "name": f"User {i}",
+                        "no": f"9{i:09d}",
+                        "gender": "Female",
+                        "email": f"user{i}@example.com",
+                    },
+                )
+            response.raise_for_status()
+        except Exception as e:
+            recorder.error(type(e).__name__)
+
+    await run_concurrent(count, concurrency, request)
+    return recorder.report()
+
+
+async def run_call(base_url, room, speaker_language, listener_language, seconds, stats):
+    """One room: a listener joins, then a speaker streams seconds of audio in real time."""
+    from websockets import connect
+
+    from client_channel import AUDIO_FRAME, BINARY_FRAMING, encode_frame
+
+    segments = deque()
+
+    async def join(ws, client_id, language, role):
+        config = {
+            "language": language,
+            "voice": "Puck",
+            "role": role,
+            "room": room,
+            "audio_framing": BINARY_FRAMING,
+        }
+        await ws.send(json.dumps({"type": "config", "config": config}))
+        ack = json.loads(await ws.recv())
+        if ack.get("type") != "config_ack":
+            raise RuntimeError(f"{client_id} got {ack.get('type')} instead of config_ack")
+
+    async def listen(ws):
+        awaiting_audio = True
+        async for message in ws:
+            if isinstance(message, bytes):
+                stats["audio_frames"] += 1
+                stats["audio_bytes"] += len(message) - 5
+                if awaiting_audio and segments:
+                    stats["first_audio"].append(time.perf_counter() - segments.popleft())
+                    awaiting_audio = False
+                continue
+            message = json.loads(message)
+            if message["type"] == "text" and message["data"]["role"] == "HomeConnect":
+                stats["translations"] += 1
+                awaiting_audio = True
+
+    async def speak(ws):
+        async def read():
+            async for message in ws:
+                if isinstance(message, str):
+                    message = json.loads(message)
+                    if message["type"] == "text" and message["data"]["role"] == "You":
+                        stats["segments"] += 1
+                        segments.append(time.perf_counter())
+
+        reader = asyncio.create_task(read())
+        pcm = bytes(MIC_CHUNK_BYTES)
+        start = time.perf_counter()
+        for sequence in range(int(seconds * 10)):
+            await ws.send(encode_frame(AUDIO_FRAME, sequence, pcm))
+            # Pace frames against the clock rather than sleeping a fixed 100 ms
+            await asyncio.sleep(max(0.0, start + (sequence + 1) * 0.1 - time.perf_counter()))
+        return reader
+
+    listener_url = f"{base_url}/ws/{room}-listener"
+    speaker_url = f"{base_url}/ws/{room}-speaker"
+    async with connect(listener_url, max_size=None) as listener:
+        await join(listener, f"{room}-listener", listener_language, "user")
+        listening = asyncio.create_task(listen(listener))
+        async with connect(speaker_url, max_size=None) as speaker:
+            await join(speaker, f"{room}-speaker", speaker_language, "agent")
+            reader = await speak(speaker)
+            # Let the last utterance be transcribed, translated and spoken
+            await asyncio.sleep(3)
+            reader.cancel()
+        listening.cancel()
+        await asyncio.gather(reader, listening, return_exceptions=True)
+
+
+async def load_calls(base_url, count, seconds, speaker_language, listener_language):
+    stats = {
+        "segments": 0,
+        "translations": 0,
+        "audio_frames": 0,
+        "audio_bytes": 0,
+        "first_audio": [],
+    }
+    results = await asyncio.gather(
+        *(
+            run_call(base_url, f"room-{i}", speaker_language, listener_language, seconds, stats)
+            for i in range(count)
+        ),
+        return_exceptions=True,
+    )
+    errors = {}
+    for result in results:
+        if isinstance(result, Exception):
+            errors[type(result).__name__] = errors.get(type(result).__name__, 0) + 1
+    first_audio = stats.pop("first_audio")
+    stats["calls"] = count
+    stats["errors"] = errors
+    stats["first_audio_ms"] = latency_stats(first_audio) if first_audio else {"count": 0}
+    stats["first_audio_ms"].pop("throughput_qps", None)
+    return stats
+
+
+def prepare_workdir(workdir, listings, seed, args):
+    """Builds the synthetic listing table and points the backend's state and caches at workdir."""
+    templates = load_templates(os.path.join(BACKEND_DIR, "data", "cleaned_property_data.csv"))
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    build_synthetic_db(os.path.join(workdir, "data", "property_data.db"), listings, seed, templates=templates)
+    os.chdir(workdir)
+    os.environ.update(
+        {
+            "MONGO_URI": "memory://",
+            "PRESENCE_URL": "memory://",
+            "KEYWORD_CACHE_DB": "",
+            "TRANSLATION_CACHE_DB": "",
+            "LISTING_RELOAD_INTERVAL": "3600",
+            "GEMINI_WARM_SESSIONS": f"{args.speaker_language}:Puck,{args.listener_language}:Puck",
+            "DESCRIPTION_SEARCH": "1" if args.semantic else "0",
+        }
+    )
+
+
+def patch_backend(main, latency_scale):
+    """Swaps the services the fake modules cannot stand in for."""
+    main.tts_service = fakes.FakeTTSService()
+    main.gemini_pool.connection_factory = fakes.FakeGeminiConnection
+    # Spawned PDF workers import the real service modules, so they install the fakes first
+    main.pdf_process_pool.shutdown()
+    main.pdf_process_pool = ProcessPoolExecutor(
+        max_workers=main.PDF_JOB_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=fakes.install,
+        initargs=(latency_scale,),
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(args):
+    import httpx
+    import uvicorn
+
+    import main
+
+    patch_backend(main, args.latency_scale)
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", ws="websockets")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # Give the Gemini pool time to warm its first sessions
+    await asyncio.sleep(fakes.LATENCY["live_connect"] * args.latency_scale + 0.2)
+
+    rss_before = rss_bytes()
+    base_url = f"http://127.0.0.1:{port}"
+    transcripts = search_transcripts(main.search_engine, args.searches, args.seed)
+    rankings = args.rankings.split(",")
+    report = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def scenario(name, work):
+            print(f"Running {name}", file=sys.stderr, flush=True)
+            start = time.perf_counter()
+            report[name] = await work
+            report[name]["wall_seconds"] = time.perf_counter() - start
+
+        scenarios = []
+        if args.searches:
+            scenarios.append(
+                scenario(
+                    "properties",
+                    load_properties(client, transcripts, args.concurrency, rankings, args.semantic),
+                )
+            )
+        if args.uploads:
+            scenarios.append(
+                scenario(
+                    "upload",
+                    load_uploads(
+                        client, args.uploads, args.upload_concurrency, args.pdf_pages, args.listener_language
+                    ),
+                )
+            )
+        if args.registrations:
+            scenarios.append(
+                scenario("register", load_register(client, args.registrations, args.concurrency))
+            )
+        if args.calls:
+            scenarios.append(
+                scenario(
+                    "ws",
+                    load_calls(
+                        f"ws://127.0.0.1:{port}",
+                        args.calls,
+                        args.call_seconds,
+                        args.speaker_language,
+                        args.listener_language,
+                    ),
+                )
+            )
+        # Every scenario runs at once, so each is measured under the others' load
+        await asyncio.gather(*scenarios)
+        # Queued OTP sends drain in the background
+        await asyncio.sleep(1)
+        report["metrics"] = (await client.get("/metrics")).json()
+
+    rss_after = rss_bytes()
+    report["memory"] = {
+        "rss_growth_mb": (rss_after - rss_before) / 2**20 if rss_before is not None else None,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    report["fake_calls"] = dict(fakes.calls)
+    server.should_exit = True
+    await serving
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--rankings", default="tfidf,bitset")
+    parser.add_argument("--semantic", action="store_true", help="build the description index and rerank searches")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--pdf-pages", type=int, default=4)
+    parser.add_argument("--registrations", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--call-seconds", type=float, default=10)
+    parser.add_argument("--speaker-language", default="en")
+    parser.add_argument("--listener-language", default="hi")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplies every fake service latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the server's own output")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    fakes.install(args.latency_scale)
+    sys.path.insert(0, BACKEND_DIR)
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, args.listings, args.seed, args)
+        # The backend prints every relayed utterance; keep the report readable
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            report = asyncio.run(run(args))
+        os.chdir(BACKEND_DIR)
+
+    report = {
+        "benchmark": "load_test",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "parameters": vars(args),
+        **report,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compares the TF-IDF/FAISS and bitset amenity rankings on the listing table:
+latency percentiles, throughput and how often the two return the same
+listings. Run from Backend/:
+
+    python -m benchmarks.ranking_engines --queries 500 --output ranking.json
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from listing_store import ListingStore
+from search_engine import PropertySearchEngine
+
+
+def sample_queries(engine, n, seed=0):
+    """Builds queries from random listings: their size and area, a looser budget and some of their amenities."""
+    rng = random.Random(seed)
+    df = engine.df
+    amenity_lists = engine.listings.amenity_lists()
+    queries = []
+    for _ in range(n):
+        row = rng.randrange(len(df))
+        amenities = amenity_lists[row]
+        location = str(df["location"].iloc[row]).split(",")[-1].strip()
+        queries.append(
+            {
+                "size": int(df["size"].iloc[row]),
+                "price": float(df["price"].iloc[row]) * rng.uniform(1.0, 1.5),
+                "location": location,
+                "amenities": rng.sample(amenities, min(len(amenities), rng.randint(1, 3))),
+            }
+        )
+    return queries
+
+
+def latency_stats(samples):
+    samples = np.array(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p99_ms": float(np.percentile(samples, 99) * 1000),
+        "mean_ms": float(samples.mean() * 1000),
+        "throughput_qps": float(len(samples) / samples.sum()) if samples.sum() else None,
+    }
+
+
+def run_engine(engine, queries, ranking):
+    """Returns per-query latencies and result links for one ranking mode."""
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        result = engine.search(
+            q["size"], q["price"], q["location"], q["amenities"], ranking=ranking
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append([] if isinstance(result, str) else list(result["link"]))
+    return latencies, results
+
+
+def agreement(results_a, results_b):
+    """Top-1 agreement and mean overlap of the returned listings, over queries where both found something."""
+    pairs = [(a, b) for a, b in zip(results_a, results_b) if a and b]
+    if not pairs:
+        return {"queries": 0}
+    return {
+        "queries": len(pairs),
+        "top1": sum(a[0] == b[0] for a, b in pairs) / len(pairs),
+        "overlap_at_5": float(
+            np.mean([len(set(a) & set(b)) / max(len(a), len(b)) for a, b in pairs])
+        ),
+    }
+
+
+def benchmark(engine, queries, rankings=PropertySearchEngine.RANKINGS):
+    report = {"listings": len(engine.df), "rankings": {}}
+    results = {}
+    for ranking in rankings:
+        run_engine(engine, queries[:10], ranking)  # warm up
+        latencies, results[ranking] = run_engine(engine, queries, ranking)
+        report["rankings"][ranking] = latency_stats(latencies)
+    if "tfidf" in results:
+        report["agreement_with_tfidf"] = {
+            ranking: agreement(results["tfidf"], links)
+            for ranking, links in results.items()
+            if ranking != "tfidf"
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="data/property_data.db")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    engine = PropertySearchEngine.load_or_build(ListingStore(args.db).load_table(), args.db)
+    report = benchmark(engine, sample_queries(engine, args.queries, args.seed))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Measures find_similar_properties with each ranking mode on synthetic
+listing tables of increasing size: build time and memory of the indexes,
+then latency percentiles and throughput of queries drawn from the table.
+"semantic" is the TF-IDF ranking reranked by the description index.
+Run from Backend/:
+
+    python -m benchmarks.retrieval_scaling --sizes 1000,10000,100000 --output retrieval.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import fakes
+from benchmarks.ranking_engines import agreement, latency_stats, sample_queries
+from benchmarks.synthetic import build_synthetic_db, load_templates
+
+MODES = ("tfidf", "bitset", "semantic")
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def build_engine(db_path, semantic):
+    """Loads the listings and builds their indexes as the server does; returns (engine, report)."""
+    from description_index import DescriptionIndex, HashingEmbedder
+    from listing_store import ListingStore
+    from search_engine import PropertySearchEngine
+
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = ListingStore(db_path)
+    engine = PropertySearchEngine.load_or_build(store.load_table(), db_path)
+    loaded = time.perf_counter()
+    if semantic:
+        engine.descriptions = DescriptionIndex.load_or_build(store, db_path, HashingEmbedder())
+    built = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+
+    listings = engine.listings
+    report = {
+        "load_seconds": loaded - start,
+        "description_index_seconds": built - loaded if semantic else None,
+        # tracemalloc sees Python and NumPy allocations; FAISS memory only shows in RSS
+        "traced_peak_mb": peak / 2**20,
+        "rss_growth_mb": (rss_after - rss_before) / 2**20 if rss_before is not None else None,
+        "table_mb": (listings.df.memory_usage(deep=True).sum() + listings.amenity_bits.nbytes)
+        / 2**20,
+        "amenity_vocabulary": len(listings.vocabulary),
+    }
+    if engine.descriptions is not None:
+        report["description_index"] = engine.descriptions.stats()
+    return engine, report
+
+
+def query_description(query):
+    """A transcript-like description for semantic reranking."""
+    return (
+        f"{query['size']} BHK in {query['location']} with {', '.join(query['amenities'])}"
+    )
+
+
+def run_mode(engine, queries, mode):
+    """Returns per-query latencies and result links for one mode through find_similar_properties."""
+    from retrieval import find_similar_properties
+
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        result = find_similar_properties(
+            engine.df,
+            q["size"],
+            q["price"],
+            q["location"],
+            q["amenities"],
+            engine=engine,
+            ranking="bitset" if mode == "bitset" else "tfidf",
+            description=query_description(q) if mode == "semantic" else None,
+        )
+        latencies.append(time.perf_counter() - start)
+        results.append([] if isinstance(result, str) else list(result["link"]))
+    return latencies, results
+
+
+def benchmark_size(size, queries, seed, modes, workdir, templates):
+    db_path = os.path.join(workdir, f"listings_{size}.db")
+    start = time.perf_counter()
+    build_synthetic_db(db_path, size, seed, templates=templates)
+    report = {"listings": size, "generate_seconds": time.perf_counter() - start}
+
+    engine, build = build_engine(db_path, "semantic" in modes)
+    report["build"] = build
+    sample = sample_queries(engine, queries, seed)
+    report["modes"] = {}
+    results = {}
+    for mode in modes:
+        run_mode(engine, sample[:10], mode)  # warm up
+        latencies, results[mode] = run_mode(engine, sample, mode)
+        report["modes"][mode] = latency_stats(latencies)
+    if "tfidf" in results:
+        report["agreement_with_tfidf"] = {
+            mode: agreement(results["tfidf"], links)
+            for mode, links in results.items()
+            if mode != "tfidf"
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep the synthetic databases here instead of a temporary directory")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # retrieval imports the Gemini client at import time
+    fakes.install()
+    os.environ.setdefault("KEYWORD_CACHE_DB", "")
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    templates = load_templates()
+    report = {
+        "benchmark": "retrieval_scaling",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "queries": args.queries,
+        "seed": args.seed,
+        "sizes": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"Benchmarking {size} listings", flush=True)
+            report["sizes"].append(
+                benchmark_size(size, args.queries, args.seed, modes, workdir, templates)
+            )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
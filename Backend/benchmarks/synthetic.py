@@ -0,0 +1,89 @@
+"""
+Synthetic listing tables for benchmarks, drawn from the distributions of
+data/cleaned_property_data.csv: sizes, locations, amenity lists and
+description sentences are resampled from real listings and prices scaled
+around the template's, so larger tables keep the same shape as the real one.
+Run from Backend/:
+
+    python -m benchmarks.synthetic 100000 /tmp/listings.db
+"""
+
+import argparse
+import random
+import re
+
+import pandas as pd
+
+from listing_store import ListingStore, parse_amenities
+
+SOURCE_CSV = "data/cleaned_property_data.csv"
+
+
+def load_templates(csv_path=SOURCE_CSV):
+    """Reads the real listings that synthetic ones are drawn from."""
+    df = pd.read_csv(csv_path)
+    # The exported CSV pads its columns with spaces
+    df.columns = df.columns.str.strip()
+    df = df.map(lambda value: value.strip() if isinstance(value, str) else value)
+    df["amenities"] = df["amenities"].apply(parse_amenities)
+    df["location"] = df["location"].str.lower()
+    return df
+
+
+def generate_listings(n, seed=0, templates=None):
+    """
+    Yields n listing records in the CSV's schema. Each copies a random real
+    listing's size and location, scales its price, mixes its amenities with
+    another listing's and stitches a description from sentences of several.
+    """
+    rng = random.Random(seed)
+    templates = load_templates() if templates is None else templates
+    rows = templates.to_dict("records")
+    sentences = [
+        sentence.strip()
+        for text in templates["description"].dropna()
+        for sentence in re.split(r"(?<=[.!?])\s+", text)
+        if len(sentence.strip()) > 20
+    ]
+    for i in range(n):
+        row = rng.choice(rows)
+        other = rng.choice(rows)
+        pool = list(dict.fromkeys(row["amenities"] + other["amenities"]))
+        count = min(len(pool), max(0, len(row["amenities"]) + rng.randint(-2, 2)))
+        building = row["building_name"] if isinstance(row["building_name"], str) else "Residency"
+        yield {
+            "link": f"https://listings.invalid/{seed}/{i}",
+            "size": row["size"],
+            "price": round(row["price"] * rng.lognormvariate(0, 0.25), -2),
+            "location": row["location"],
+            "amenities": rng.sample(pool, count),
+            "description": " ".join(rng.sample(sentences, min(len(sentences), rng.randint(2, 5)))),
+            "building_name": f"{building} {i % 97}",
+        }
+
+
+def build_synthetic_db(db_path, n, seed=0, batch_size=10000, templates=None):
+    """Upserts n synthetic listings into the SQLite store at db_path and returns the store."""
+    store = ListingStore(db_path)
+    batch = []
+    for record in generate_listings(n, seed, templates):
+        batch.append(record)
+        if len(batch) == batch_size:
+            store.upsert(batch)
+            batch = []
+    store.upsert(batch)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("count", type=int)
+    parser.add_argument("db")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    store = build_synthetic_db(args.db, args.count, args.seed)
+    print(f"{store.count()} listings in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import asyncio
+import base64 as b64
+import struct
+import time
+from collections import deque
+
+# Binary frames are a 5-byte header (frame type, sequence number) followed by
+# the raw payload: 16-bit mono PCM for audio, JPEG bytes for images.
+FRAME_HEADER = struct.Struct(">BI")
+AUDIO_FRAME = 1
+IMAGE_FRAME = 2
+
+JSON_FRAMING = "json"
+BINARY_FRAMING = "binary"
+
+
+def encode_frame(frame_type, sequence, payload):
+    return FRAME_HEADER.pack(frame_type, sequence & 0xFFFFFFFF) + payload
+
+
+def decode_frame(data):
+    """Returns (frame type, sequence, payload) without copying the payload."""
+    frame_type, sequence = FRAME_HEADER.unpack_from(data)
+    return frame_type, sequence, memoryview(data)[FRAME_HEADER.size :]
+
+
+class AudioChunk:
+    """PCM audio whose raw and base64 forms are each computed at most once, however many listeners need them."""
+
+    __slots__ = ("_pcm", "_base64")
+
+    def __init__(self, pcm=None, base64=None):
+        self._pcm = pcm
+        self._base64 = base64
+
+    @property
+    def pcm(self):
+        if self._pcm is None:
+            self._pcm = b64.b64decode(self._base64)
+        return self._pcm
+
+    @property
+    def base64(self):
+        if self._base64 is None:
+            self._base64 = b64.b64encode(self._pcm).decode("ascii")
+        return self._base64
+
+
+class ClientChannel:
+    """
+    Outbound side of a client WebSocket. Clients that asked for binary framing
+    in their config get audio as binary frames; everyone else gets the
+    original {"type": "audio", "data": <base64>} JSON messages.
+
+    Sends never wait on the network: messages go into a bounded queue drained
+    by a dedicated writer task, so one slow listener cannot hold up the
+    speaker or other listeners. When the queue is full the oldest audio is
+    dropped first, audio that has waited longer than max_audio_lag seconds is
+    discarded as stale, and queued audio chunks are coalesced into one send
+    of up to max_coalesce_bytes.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        framing=JSON_FRAMING,
+        max_queue=64,
+        max_audio_lag=2.0,
+        max_coalesce_bytes=48000,
+    ):
+        self.websocket = websocket
+        self.framing = framing
+        self.max_queue = max_queue
+        self.max_audio_lag = max_audio_lag
+        self.max_coalesce_bytes = max_coalesce_bytes
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0.0
+        self.closed = False
+        self._sequence = 0
+        self._queue = deque()
+        self._pending = asyncio.Event()
+        self._writer = None
+
+    @property
+    def binary(self):
+        return self.framing == BINARY_FRAMING
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+    async def send_json(self, message):
+        self._enqueue("json", message)
+
+    async def send_audio(self, chunk):
+        self._enqueue("audio", chunk)
+
+    def _enqueue(self, kind, payload):
+        if self.closed:
+            return
+        if len(self._queue) >= self.max_queue:
+            self._drop_oldest()
+        self._queue.append((kind, payload, time.monotonic()))
+        self._pending.set()
+
+    def _drop_oldest(self):
+        """Drops the oldest queued audio, or the oldest message if no audio is queued."""
+        for i, (kind, _, _) in enumerate(self._queue):
+            if kind == "audio":
+                del self._queue[i]
+                break
+        else:
+            self._queue.popleft()
+        self.dropped += 1
+
+    def _next_audio(self, first):
+        """Merges audio queued right behind `first` into one chunk."""
+        if not self._queue or self._queue[0][0] != "audio":
+            return first
+        pcm = bytearray(first.pcm)
+        while (
+            self._queue
+            and self._queue[0][0] == "audio"
+            and len(pcm) + len(self._queue[0][1].pcm) <= self.max_coalesce_bytes
+        ):
+            pcm += self._queue.popleft()[1].pcm
+            self.coalesced += 1
+        return AudioChunk(pcm=bytes(pcm))
+
+    async def _write(self, kind, payload):
+        if kind == "json":
+            await self.websocket.send_json(payload)
+        elif self.binary:
+            self._sequence += 1
+            await self.websocket.send_bytes(
+                encode_frame(AUDIO_FRAME, self._sequence, payload.pcm)
+            )
+        else:
+            await self.websocket.send_json({"type": "audio", "data": payload.base64})
+
+    async def _write_loop(self):
+        while not self.closed:
+            if not self._queue:
+                self._pending.clear()
+                await self._pending.wait()
+                continue
+            kind, payload, enqueued_at = self._queue.popleft()
+            lag = time.monotonic() - enqueued_at
+            if kind == "audio":
+                if lag > self.max_audio_lag:
+                    self.dropped += 1
+                    continue
+                payload = self._next_audio(payload)
+            try:
+                await self._write(kind, payload)
+            except Exception as e:
+                print(f"Closing client channel after failed send: {e}")
+                self.closed = True
+                self._queue.clear()
+                return
+            self.sent += 1
+            self.max_lag = max(self.max_lag, lag)
+
+    def stats(self):
+        oldest = self._queue[0][2] if self._queue else None
+        return {
+            "framing": self.framing,
+            "queued": len(self._queue),
+            "lag_seconds": time.monotonic() - oldest if oldest is not None else 0.0,
+            "max_lag_seconds": self.max_lag,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
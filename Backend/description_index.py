@@ -0,0 +1,222 @@
+import hashlib
+import math
+import os
+
+import faiss
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class HashingEmbedder:
+    """Hashed word unigram and bigram vectors; needs no model download."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._vectorizer = HashingVectorizer(
+            n_features=dim,
+            ngram_range=(1, 2),
+            stop_words="english",
+            alternate_sign=False,
+            norm="l2",
+        )
+
+    def embed(self, texts):
+        return self._vectorizer.transform([text or "" for text in texts]).toarray().astype(
+            "float32"
+        )
+
+
+class SentenceTransformerEmbedder:
+    """A local sentence-transformers model run on the CPU."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return self._model.encode(
+            [text or "" for text in texts], normalize_embeddings=True, batch_size=64
+        ).astype("float32")
+
+
+def create_embedder(model_name=None):
+    """Uses the named sentence-transformers model when it is installed, else the hashing embedder."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"Could not load embedding model {model_name}, using hashed n-grams: {e}")
+    return HashingEmbedder()
+
+
+def text_digest(text):
+    """64-bit digest of a description, used to find rows whose text changed."""
+    digest = hashlib.blake2b((text or "").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def index_paths(db_path):
+    """Returns the (faiss index, row digests) paths stored next to the SQLite database."""
+    base = os.path.splitext(db_path)[0]
+    return f"{base}.descriptions.faiss", f"{base}.descriptions.npz"
+
+
+class DescriptionIndex:
+    """
+    Listing descriptions embedded into a FAISS IVF inner-product index keyed
+    by SQLite row ID. Updates only embed rows that are new or whose text
+    changed and remove deleted ones, so reloading after an upsert is cheap.
+
+    rerank scores a handful of candidates exactly from their stored vectors;
+    larger candidate sets are searched approximately with an ID selector.
+    """
+
+    def __init__(self, embedder, index=None, rowids=None, digests=None, nprobe=16, exact_limit=4096):
+        self.embedder = embedder
+        self.index = index
+        self.rowids = rowids if rowids is not None else np.empty(0, dtype="int64")
+        self.digests = digests if digests is not None else np.empty(0, dtype="int64")
+        self.nprobe = nprobe
+        self.exact_limit = exact_limit
+
+    @classmethod
+    def load_or_build(cls, store, db_path, embedder, **kwargs):
+        """Loads the persisted index if it was built with the same embedder, then brings it up to date."""
+        index_path, digests_path = index_paths(db_path)
+        descriptions = None
+        if os.path.exists(index_path) and os.path.exists(digests_path):
+            try:
+                saved = np.load(digests_path)
+                if str(saved["embedder"]) == embedder.name:
+                    descriptions = cls(
+                        embedder,
+                        faiss.read_index(index_path),
+                        saved["rowids"],
+                        saved["digests"],
+                        **kwargs,
+                    )
+            except Exception as e:
+                print(f"Could not load description index, rebuilding: {e}")
+        if descriptions is None:
+            descriptions = cls(embedder, **kwargs)
+        if descriptions.update(store) != (0, 0):
+            descriptions.save(db_path)
+        return descriptions
+
+    def save(self, db_path):
+        index_path, digests_path = index_paths(db_path)
+        faiss.write_index(self.index, index_path)
+        with open(digests_path, "wb") as f:
+            np.savez(f, embedder=self.embedder.name, rowids=self.rowids, digests=self.digests)
+
+    def _new_index(self, count):
+        # About sqrt(n) lists, with enough rows per list to train the centroids.
+        nlist = max(1, min(int(math.sqrt(count)), count // 39))
+        quantizer = faiss.IndexFlatIP(self.embedder.dim)
+        index = faiss.IndexIVFFlat(quantizer, self.embedder.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+
+    def update(self, store, batch_size=4096):
+        """Embeds new and changed descriptions and drops deleted rows; returns (added, removed)."""
+        known = dict(zip(self.rowids.tolist(), self.digests.tolist()))
+        seen_rowids, seen_digests = [], []
+        stale = []
+        pending_ids, pending_vectors = [], []
+        added = 0
+
+        if self.index is None:
+            self.index = self._new_index(store.count())
+        train_size = max(self.index.nlist * 39, 1)
+
+        def flush(final=False):
+            nonlocal added
+            if not pending_ids:
+                return
+            vectors = np.concatenate(pending_vectors)
+            if not self.index.is_trained:
+                if len(vectors) < train_size and not final:
+                    return
+                self.index.train(vectors)
+            self.index.add_with_ids(vectors, np.array(pending_ids, dtype="int64"))
+            added += len(pending_ids)
+            pending_ids.clear()
+            pending_vectors.clear()
+
+        for batch in store.iter_descriptions(batch_size):
+            changed_ids, changed_texts = [], []
+            for rowid, text in batch:
+                digest = text_digest(text)
+                seen_rowids.append(rowid)
+                seen_digests.append(digest)
+                previous = known.pop(rowid, None)
+                if previous == digest:
+                    continue
+                if previous is not None:
+                    stale.append(rowid)
+                changed_ids.append(rowid)
+                changed_texts.append(text)
+            if changed_ids:
+                if stale:
+                    self._remove(stale)
+                    stale.clear()
+                pending_ids.extend(changed_ids)
+                pending_vectors.append(self.embedder.embed(changed_texts))
+                flush()
+        flush(final=True)
+
+        # Rows left in known no longer exist
+        removed = list(known)
+        if removed:
+            self._remove(removed)
+        order = np.argsort(np.array(seen_rowids, dtype="int64"), kind="stable")
+        self.rowids = np.array(seen_rowids, dtype="int64")[order]
+        self.digests = np.array(seen_digests, dtype="int64")[order]
+        return added, len(removed)
+
+    def _remove(self, rowids):
+        # The hashtable direct map only supports removal by an explicit ID array
+        ids = np.array(rowids, dtype="int64")
+        self.index.remove_ids(faiss.IDSelectorArray(ids))
+
+    def rerank(self, rowids, query, k=None):
+        """
+        Returns positions into rowids ordered by description similarity to
+        query, best first. Rows missing from the index sort last.
+        """
+        rowids = np.asarray(rowids, dtype="int64")
+        k = len(rowids) if k is None else min(k, len(rowids))
+        if len(rowids) == 0 or self.index is None or self.index.ntotal == 0:
+            return np.arange(k)
+        query_vector = self.embedder.embed([query])
+
+        slots = np.searchsorted(self.rowids, rowids)
+        present = (slots < len(self.rowids)) & (
+            self.rowids[np.minimum(slots, len(self.rowids) - 1)] == rowids
+        )
+        scores = np.full(len(rowids), -np.inf, dtype="float32")
+        if len(rowids) <= self.exact_limit:
+            if present.any():
+                vectors = self.index.reconstruct_batch(rowids[present])
+                scores[present] = vectors @ query_vector[0]
+        else:
+            params = faiss.SearchParametersIVF(
+                sel=faiss.IDSelectorBatch(rowids[present]), nprobe=self.nprobe
+            )
+            found_scores, found_ids = self.index.search(query_vector, k, params=params)
+            hits = found_ids[0] >= 0
+            position_of = {rowid: i for i, rowid in enumerate(rowids.tolist())}
+            for rowid, score in zip(found_ids[0][hits], found_scores[0][hits]):
+                scores[position_of[int(rowid)]] = score
+        return np.argsort(-scores, kind="stable")[:k]
+
+    def stats(self):
+        return {
+            "embedder": self.embedder.name,
+            "vectors": int(self.index.ntotal) if self.index is not None else 0,
+            "lists": int(self.index.nlist) if self.index is not None else 0,
+        }
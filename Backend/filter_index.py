@@ -0,0 +1,89 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+NGRAM = 3
+
+
+def normalize_location(location):
+    """Lowercases a location and collapses repeated whitespace."""
+    if not isinstance(location, str):
+        return ""
+    return re.sub(r"\s+", " ", location.lower()).strip()
+
+
+def location_ngrams(text, n=NGRAM):
+    """Returns the set of character n-grams of a normalized location."""
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class FilterIndex:
+    """
+    Precomputed size / location / price filters over the listing table.
+    Rows are bucketed by (size, location) and sorted by price inside each
+    bucket, so a query is a dictionary lookup plus one bisect per matching
+    location and never copies or scans the DataFrame.
+    """
+
+    def __init__(self, df):
+        sizes = df["size"].to_numpy()
+        prices = df["price"].to_numpy(dtype="float64")
+        location_codes, self.locations = pd.factorize(
+            df["location"].map(normalize_location)
+        )
+        self.location_ids = {loc: code for code, loc in enumerate(self.locations)}
+
+        self.ngrams = {}
+        for code, loc in enumerate(self.locations):
+            for gram in location_ngrams(loc):
+                self.ngrams.setdefault(gram, set()).add(code)
+
+        order = np.lexsort((prices, location_codes, sizes))
+        self.buckets = {}
+        self.size_locations = {}
+        keys = np.stack([sizes[order], location_codes[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        for rows in np.split(order, boundaries):
+            if rows.size == 0:
+                continue
+            size, code = int(sizes[rows[0]]), int(location_codes[rows[0]])
+            self.buckets[(size, code)] = (rows, prices[rows])
+            self.size_locations.setdefault(size, []).append(code)
+
+    def match_location(self, user_location):
+        """Returns location codes matching exactly first, then those containing the query."""
+        query = normalize_location(user_location)
+        exact = self.location_ids.get(query)
+        if len(query) >= NGRAM:
+            postings = [self.ngrams.get(gram, set()) for gram in location_ngrams(query)]
+            candidates = set.intersection(*postings) if postings else set()
+        else:
+            candidates = range(len(self.locations))
+        partial = sorted(
+            code for code in candidates if code != exact and query in self.locations[code]
+        )
+        return ([exact] if exact is not None else []) + partial
+
+    def candidates(self, user_size, user_price, user_location):
+        """Returns row positions passing all filters, or a message naming the filter that emptied the set."""
+        if user_size not in self.size_locations:
+            return "No properties found with the given size."
+
+        buckets = [
+            self.buckets[(user_size, code)]
+            for code in self.match_location(user_location)
+            if (user_size, code) in self.buckets
+        ]
+        if not buckets:
+            return "No properties found in the specified location."
+
+        upper_price_limit = user_price * 1.05
+        parts = [
+            rows[: np.searchsorted(prices, upper_price_limit, side="right")]
+            for rows, prices in buckets
+        ]
+        positions = np.concatenate(parts)
+        if positions.size == 0:
+            return "No properties found within the price range."
+        return positions
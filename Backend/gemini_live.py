@@ -0,0 +1,309 @@
+import asyncio
+import base64 as b64
+import json
+import os
+import time
+
+from websockets import connect
+from websockets.exceptions import ConnectionClosed
+from websockets.protocol import State
+
+
+class GeminiConnection:
+    def __init__(self):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        self.model = "gemini-2.0-flash-exp"
+        self.uri = (
+            "wss://generativelanguage.googleapis.com/ws/"
+            "google.ai.generativelanguage.v1alpha.GenerativeService.BidiGenerateContent"
+            f"?key={self.api_key}"
+        )
+        self.ws = None
+        self.config = None
+        self.closing = False
+        self.reconnects = 0
+        self._reconnect_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Initialize connection to Gemini"""
+        self.closing = False
+        self.ws = await connect(
+            self.uri, extra_headers={"Content-Type": "application/json"}
+        )
+
+        if not self.config:
+            raise ValueError("Configuration must be set before connecting")
+
+        # Send initial setup message with configuration
+        setup_message = {
+            "setup": {
+                "model": f"models/{self.model}",
+                "generation_config": {
+                    "response_modalities": ["TEXT"],
+                    "speech_config": {
+                        "voice_config": {
+                            "prebuilt_voice_config": {
+                                "voice_name": self.config["voice"]
+                            }
+                        }
+                    },
+                },
+                "system_instruction": {
+                    "parts": [
+                        {
+                            "text": f"You are a translation agent. Whatever the user says, JUST TRANSLATE IT TO {self.config['language']}. Do NOT add anything else. Preserve the meaning of the sentences the user says. Do NOT repeat what the user says in the same language."
+                        }
+                    ]
+                },
+            }
+        }
+        await self.ws.send(json.dumps(setup_message))
+
+        # Wait for setup completion
+        setup_response = await self.ws.recv()
+        return setup_response
+
+    def set_config(self, config):
+        """Set configuration for the connection"""
+        self.config = config
+
+    def is_open(self):
+        return self.ws is not None and self.ws.state is State.OPEN
+
+    async def ping(self, timeout=10):
+        """Checks the connection is alive; returns False if it is not."""
+        try:
+            pong = await self.ws.ping()
+            await asyncio.wait_for(pong, timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _send(self, message):
+        """Sends a message (dict or pre-serialized JSON), reconnecting once if the connection dropped."""
+        if not isinstance(message, str):
+            message = json.dumps(message)
+        ws = self.ws
+        try:
+            await ws.send(message)
+        except ConnectionClosed:
+            if self.closing:
+                raise
+            await self._reconnect(ws)
+            await self.ws.send(message)
+
+    async def _reconnect(self, dropped):
+        """
+        Replaces the dropped socket. The sender and the receive loop both see
+        the same drop, so only the first one reconnects; the other finds
+        self.ws already replaced and uses the new socket.
+        """
+        async with self._reconnect_lock:
+            if self.ws is not dropped:
+                return
+            self.reconnects += 1
+            print(f"Gemini connection dropped, reconnecting ({self.reconnects})")
+            await dropped.close()
+            await self.connect()
+
+    async def send_audio(self, audio_data: str):
+        """Send base64 audio data from a client to Gemini"""
+        audio_message = {
+            "realtime_input": {
+                "media_chunks": [{"data": audio_data, "mime_type": "audio/pcm"}]
+            }
+        }
+        await self._send(audio_message)
+
+    async def send_audio_bytes(self, pcm):
+        """Send raw PCM audio (bytes or memoryview) to Gemini"""
+        # We produced the base64 ourselves, so it needs no JSON escaping and
+        # the message is assembled directly instead of through json.dumps.
+        await self._send(
+            '{"realtime_input": {"media_chunks": [{"data": "'
+            + b64.b64encode(pcm).decode("ascii")
+            + '", "mime_type": "audio/pcm"}]}}'
+        )
+
+    async def receive(self):
+        """Receive message from Gemini"""
+        ws = self.ws
+        try:
+            return await ws.recv()
+        except ConnectionClosed:
+            if self.closing:
+                raise
+            await self._reconnect(ws)
+            return await self.ws.recv()
+
+    async def close(self):
+        """Close the connection"""
+        self.closing = True
+        if self.ws:
+            await self.ws.close()
+
+    async def send_image(self, image_data: str):
+        """Send image data to Gemini"""
+        image_message = {
+            "realtime_input": {
+                "media_chunks": [{"data": image_data, "mime_type": "image/jpeg"}]
+            }
+        }
+        await self._send(image_message)
+
+    async def send_image_bytes(self, image):
+        """Send raw JPEG bytes to Gemini"""
+        await self.send_image(b64.b64encode(image).decode("ascii"))
+
+    async def send_text(self, text: str):
+        """Send text message to Gemini"""
+        text_message = {
+            "client_content": {
+                "turns": [{"role": "user", "parts": [{"text": text}]}],
+                "turn_complete": True,
+            }
+        }
+        await self._send(text_message)
+
+
+def session_key(config):
+    """Sessions are interchangeable when their setup message is the same."""
+    return (config.get("language"), config.get("voice"))
+
+
+class GeminiSessionPool:
+    """
+    Keeps pre-connected Gemini Live sessions ready per (language, voice) so a
+    call can start without waiting for the TLS and setup handshake.
+    Sessions are single-use: a session carries conversation state, so it is
+    closed when its client leaves and a fresh one is warmed in its place.
+    A background loop pings idle sessions, replaces dead ones, evicts sessions
+    idle for longer than max_idle and stops warming keys unused for key_ttl.
+    """
+
+    def __init__(
+        self,
+        warm_per_key=1,
+        max_idle=300,
+        key_ttl=1800,
+        health_interval=30,
+        connection_factory=GeminiConnection,
+    ):
+        self.warm_per_key = warm_per_key
+        self.max_idle = max_idle
+        self.key_ttl = key_ttl
+        self.health_interval = health_interval
+        self.connection_factory = connection_factory
+        self.hits = 0
+        self.misses = 0
+        self._ready = {}
+        self._keys = {}
+        self._refills = {}
+        self._health_task = None
+
+    async def _open(self, config):
+        session = self.connection_factory()
+        session.set_config(config)
+        await session.connect()
+        return session
+
+    async def acquire(self, config):
+        """Returns a connected session for config, warm if one is ready."""
+        key = session_key(config)
+        self._keys[key] = (config, time.monotonic())
+        ready = self._ready.setdefault(key, [])
+        session = None
+        while ready:
+            candidate, _ = ready.pop()
+            if candidate.is_open():
+                session = candidate
+                break
+            await candidate.close()
+        if session is None:
+            self.misses += 1
+            session = await self._open(config)
+        else:
+            self.hits += 1
+        session.set_config(config)
+        self._refill(key)
+        return session
+
+    async def release(self, session):
+        """Closes a session whose client has left."""
+        await session.close()
+
+    def warm(self, config):
+        """Starts keeping sessions ready for config without attaching a client."""
+        key = session_key(config)
+        self._keys[key] = (config, time.monotonic())
+        self._refill(key)
+
+    def _refill(self, key):
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._fill(key))
+
+    async def _fill(self, key):
+        while key in self._keys:
+            # Looked up on every pass: _check drops the list of a key it stops warming
+            if len(self._ready.setdefault(key, [])) >= self.warm_per_key:
+                return
+            config, _ = self._keys[key]
+            try:
+                session = await self._open(config)
+            except Exception as e:
+                print(f"Could not warm Gemini session for {key}: {e}")
+                return
+            if key not in self._keys:
+                await session.close()
+                return
+            self._ready.setdefault(key, []).append((session, time.monotonic()))
+
+    async def _check(self):
+        now = time.monotonic()
+        for key, ready in list(self._ready.items()):
+            for entry in list(ready):
+                session, since = entry
+                if now - since <= self.max_idle and await session.ping():
+                    continue
+                # Skip sessions handed to a client while we were pinging.
+                if entry in ready:
+                    ready.remove(entry)
+                    await session.close()
+            if key in self._keys and now - self._keys[key][1] > self.key_ttl:
+                del self._keys[key]
+            if key not in self._keys:
+                for session, _ in self._ready.pop(key, []):
+                    await session.close()
+            elif len(ready) < self.warm_per_key:
+                self._refill(key)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check()
+            except Exception as e:
+                print(f"Gemini session health check failed: {e}")
+
+    def start(self, configs=()):
+        for config in configs:
+            self.warm(config)
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        tasks = [t for t in [self._health_task, *self._refills.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for ready in self._ready.values():
+            for session, _ in ready:
+                await session.close()
+        self._ready.clear()
+
+    def stats(self):
+        return {
+            "ready": {f"{k[0]}/{k[1]}": len(v) for k, v in self._ready.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Durable background job queue backed by a SQLite table.
+    Jobs survive restarts, each job gets its own working directory, failed
+    attempts are retried with exponential backoff, and at most `concurrency`
+    jobs run at once.
+
+    Several workers may share the table. A claimed job is leased to the
+    claiming worker_id for `lease` seconds and the lease is renewed while
+    the job runs, so only jobs whose worker stopped heartbeating (crashed
+    or restarted) are picked up again, never one another worker is still
+    processing.
+
+    handler is an async callable (job_id, payload, job_dir, set_stage) that
+    returns a JSON-serializable result; set_stage is a coroutine function.
+    Every database call runs in a thread: claiming takes a write lock on a
+    table other workers share, which may wait out SQLite's busy timeout.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        work_dir,
+        handler,
+        concurrency=2,
+        max_attempts=3,
+        retry_delay=5.0,
+        keep_finished_dirs=False,
+        worker_id=None,
+        lease=60.0,
+    ):
+        self.db_path = db_path
+        self.work_dir = work_dir
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.keep_finished_dirs = keep_finished_dirs
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._workers = []
+        os.makedirs(work_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_until REAL,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        # Tables created before leases were added
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("worker_id", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)"
+        )
+        self._conn.commit()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.work_dir, job_id)
+
+    def create(self):
+        """Reserves a job ID and its working directory; call submit() once the inputs are in place."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        return job_id
+
+    async def submit(self, job_id, payload):
+        await asyncio.to_thread(self._insert, job_id, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _insert(self, job_id, payload):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, QUEUED, json.dumps(payload), now, now, now),
+            )
+            self._conn.commit()
+
+    def _get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def _update(self, job_id, **fields):
+        """Updates a job this worker holds; returns False if its lease was lost to another worker."""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            updated = self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND worker_id = ?",
+                (*fields.values(), job_id, self.worker_id),
+            ).rowcount
+            self._conn.commit()
+        return updated > 0
+
+    def _claim(self):
+        """
+        Atomically leases the oldest runnable job to this worker and returns
+        it. Runnable jobs are queued ones that are due and running ones whose
+        lease expired; an expired job that has used all its attempts fails.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, error = ?, updated_at = ? "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) AND attempts >= ?",
+                (FAILED, FAILED, "Worker stopped responding", now, RUNNING, now, self.max_attempts),
+            )
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND (lease_until IS NULL OR lease_until < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, self.worker_id, now + self.lease, now, row["id"]),
+            )
+            self._conn.commit()
+        return self._get(row["id"])
+
+    async def _heartbeat(self, job_id):
+        """Renews the lease on a running job until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    self._update, job_id, lease_until=time.time() + self.lease
+                )
+                if not renewed:
+                    print(f"Lost the lease on job {job_id}")
+                    return
+            except Exception as e:
+                print(f"Could not renew the lease on job {job_id}: {e}")
+
+    async def _run(self, job):
+        job_id = job["id"]
+
+        async def set_stage(stage):
+            await asyncio.to_thread(self._update, job_id, stage=stage)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await self.handler(job_id, job["payload"], self.job_dir(job_id), set_stage)
+        except Exception as e:
+            print(f"Job {job_id} attempt {job['attempts']} failed: {e}")
+            if job["attempts"] < self.max_attempts:
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                await asyncio.to_thread(
+                    self._update,
+                    job_id,
+                    status=QUEUED,
+                    error=str(e),
+                    available_at=time.time() + delay,
+                )
+                return
+            finished = await asyncio.to_thread(
+                self._update, job_id, status=FAILED, stage=FAILED, error=str(e)
+            )
+        else:
+            finished = await asyncio.to_thread(
+                self._update,
+                job_id,
+                status=DONE,
+                stage=DONE,
+                error=None,
+                result=json.dumps(result),
+            )
+        finally:
+            heartbeat.cancel()
+        # A worker that lost its lease leaves the directory to the new holder
+        if finished and not self.keep_finished_dirs:
+            await asyncio.to_thread(shutil.rmtree, self.job_dir(job_id), ignore_errors=True)
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.retry_delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    def start(self):
+        """Starts the worker tasks. Jobs interrupted by a restart are claimed again once their lease expires."""
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
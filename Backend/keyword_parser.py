@@ -0,0 +1,109 @@
+import re
+
+PRICE_UNITS = {
+    "k": 1_000,
+    "thousand": 1_000,
+    "l": 100_000,
+    "lac": 100_000,
+    "lacs": 100_000,
+    "lakh": 100_000,
+    "lakhs": 100_000,
+    "cr": 10_000_000,
+    "crore": 10_000_000,
+    "crores": 10_000_000,
+}
+
+SIZE_PATTERN = re.compile(r"\b(\d{1,2})\s*-?\s*(?:bhk|bed(?:room)?s?|b\.h\.k)\b")
+PRICE_PATTERN = re.compile(
+    r"(?:(?P<cue>under|within|below|upto|up to|max(?:imum)?|around|less than|budget(?: of| is)?|rent(?: of)?"
+    r"|rs\.?|inr|₹)\s*(?:rs\.?|inr|₹)?\s*)?"
+    r"(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>lakhs?|lacs?|l|k|thousand|crores?|cr)?\b"
+)
+LOCATION_PATTERN = re.compile(
+    r"\b(?:in|at)\s+(?P<location>[a-z][a-z .'-]*?)"
+    r"(?=\s+(?:under|within|below|for|with|budget|upto|up to|max|around|having|and|at)\b|[,.;!?]|$)"
+)
+# Words that may surround the size, price and location without adding a
+# requirement. Anything else left in the transcript (amenities, negations,
+# possession dates, floors, pets...) needs the LLM.
+FILLER_WORDS = frozenset(
+    """
+    a an the i i'm im am we are is it me us my our you can could would please
+    hi hello looking look searching search find show need want wanted like to
+    get for some any something options flat flats apartment apartments home
+    house property properties place rent rental buy sale purchase on of and
+    in at budget price rs inr rupees per month monthly
+    """.split()
+)
+WORD_PATTERN = re.compile(r"[a-z0-9'₹]+")
+
+
+def normalize_transcript(text):
+    """Lowercases a transcript, drops digit-group commas and collapses whitespace, for use as a cache key."""
+    text = text.lower().strip()
+    text = re.sub(r"(?<=\d),(?=\d)", "", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(".!? ")
+
+
+def parse_price(match):
+    amount = float(match.group("amount").replace(",", ""))
+    unit = match.group("unit")
+    if unit:
+        amount *= PRICE_UNITS[unit]
+    return amount
+
+
+def parse_requirements(text, location_matcher=None):
+    """
+    Parses size, price and location from a transcript with regular expressions.
+    Returns the same dict shape as the LLM extraction, or None unless the
+    parse is unambiguous: exactly one size, one price (a cued or unit-bearing
+    amount is preferred over a bare number) and one location known to
+    location_matcher, with nothing but FILLER_WORDS left over.
+    """
+    text = normalize_transcript(text)
+
+    size_matches = list(SIZE_PATTERN.finditer(text))
+    if len(size_matches) != 1:
+        return None
+    size_match = size_matches[0]
+
+    price_matches = [
+        match
+        for match in PRICE_PATTERN.finditer(text)
+        if match.end("amount") <= size_match.start() or match.start("amount") >= size_match.end()
+    ]
+    cued = [m for m in price_matches if m.group("cue") or m.group("unit")]
+    candidates = cued or [m for m in price_matches if len(m.group("amount")) >= 4]
+    if len(candidates) != 1:
+        return None
+    price_match = candidates[0]
+
+    location_matches = list(LOCATION_PATTERN.finditer(text))
+    if len(location_matches) != 1:
+        return None
+    location_match = location_matches[0]
+    location = location_match.group("location").strip(" .'-")
+    if not location or (location_matcher is not None and not location_matcher(location)):
+        return None
+
+    # Everything outside the matched spans must be filler
+    spans = sorted(m.span() for m in (size_match, price_match, location_match))
+    rest, start = [], 0
+    for span_start, span_end in spans:
+        if span_start < start:
+            return None
+        rest.append(text[start:span_start])
+        start = span_end
+    rest.append(text[start:])
+    if any(word not in FILLER_WORDS for word in WORD_PATTERN.findall(" ".join(rest))):
+        return None
+
+    price = parse_price(price_match)
+    return {
+        "size": int(size_match.group(1)),
+        "price": int(price) if price.is_integer() else price,
+        "location": location.title(),
+        "amenities": [],
+    }
@@ -0,0 +1,323 @@
+import ast
+import hashlib
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = [
+    "link",
+    "size",
+    "price",
+    "location",
+    "amenities",
+    "description",
+    "building_name",
+]
+
+RANKING_COLUMNS = ["link", "size", "price", "location", "amenities"]
+
+
+def parse_amenities(value):
+    """Returns amenities as a list from a list, a Python list literal or a comma-separated string."""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    value = value.strip()
+    if value.startswith("["):
+        return ast.literal_eval(value)
+    return value.split(",")
+
+
+def _strip(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def clean_record(record):
+    """Normalizes one raw listing the way the original CSV import did."""
+    return {
+        "link": _strip(record["link"]),
+        "size": int(record["size"]),
+        "price": float(record["price"]),
+        "location": _strip(str(record["location"])).lower(),
+        "amenities": ",".join(parse_amenities(record.get("amenities"))),
+        "description": _strip(record.get("description")),
+        "building_name": _strip(record.get("building_name")),
+    }
+
+
+class ListingTable:
+    """
+    The ranking columns of every listing in compact arrays: a DataFrame of
+    SQLite row IDs, links, int8 sizes, float32 prices and categorical
+    locations, plus each listing's amenities as a packed bitset over a
+    shared vocabulary. Result columns such as description and building_name
+    are only read for the rows being returned.
+    """
+
+    def __init__(self, df, vocabulary, amenity_bits, store=None, details=None, generation=0):
+        self.df = df.reset_index(drop=True)
+        self.vocabulary = vocabulary
+        self.amenity_bits = amenity_bits
+        self.store = store
+        self.generation = generation
+        self._details = details
+
+    @classmethod
+    def from_frame(cls, df, store=None, generation=0):
+        """
+        Builds a table from a frame with an amenities list column. Without a
+        store, result columns are kept from the frame itself.
+        """
+        df = df.reset_index(drop=True)
+        amenities = [parse_amenities(value) for value in df["amenities"]]
+        vocabulary = sorted({amenity for listing in amenities for amenity in listing})
+        columns = {amenity: i for i, amenity in enumerate(vocabulary)}
+        bits = np.zeros((len(df), max(len(vocabulary), 1)), dtype=bool)
+        rows = np.repeat(np.arange(len(df)), [len(listing) for listing in amenities])
+        cols = [columns[amenity] for listing in amenities for amenity in listing]
+        bits[rows, cols] = True
+
+        compact = pd.DataFrame(
+            {
+                "rowid": df["rowid"].to_numpy(dtype="int64")
+                if "rowid" in df
+                else np.arange(len(df), dtype="int64"),
+                "link": df["link"].to_numpy(dtype=object),
+                "size": df["size"].to_numpy(dtype="int8"),
+                "price": df["price"].to_numpy(dtype="float32"),
+                "location": df["location"].astype("category"),
+            }
+        )
+        details = None
+        if store is None:
+            details = df.assign(amenities=amenities)[RESULT_COLUMNS]
+        return cls(
+            compact, vocabulary, np.packbits(bits, axis=1), store, details, generation
+        )
+
+    def __len__(self):
+        return len(self.df)
+
+    def amenity_matrix(self):
+        """Unpacks the bitsets into a (listings, vocabulary) boolean matrix."""
+        return np.unpackbits(self.amenity_bits, axis=1, count=len(self.vocabulary)).astype(bool)
+
+    def amenity_lists(self):
+        """Returns each listing's amenities, in vocabulary order."""
+        vocabulary = np.array(self.vocabulary, dtype=object)
+        return [list(vocabulary[row]) for row in self.amenity_matrix()]
+
+    def fingerprint(self):
+        """Hashes links and amenities so indexes built from other data can be detected."""
+        digest = hashlib.sha256()
+        for link in self.df["link"]:
+            digest.update(str(link).encode("utf-8"))
+            digest.update(b"\x00")
+        digest.update("\x00".join(self.vocabulary).encode("utf-8"))
+        digest.update(np.ascontiguousarray(self.amenity_bits).tobytes())
+        return digest.hexdigest()
+
+    def details(self, positions):
+        """Returns RESULT_COLUMNS for the given row positions, in that order."""
+        if self.store is None:
+            return self._details.iloc[positions].reset_index(drop=True)
+        rowids = self.df["rowid"].to_numpy()[positions]
+        return self.store.fetch(rowids)
+
+
+class ListingStore:
+    """
+    Listings in the SQLite "properties" table, unique by link. Ingestion
+    upserts rows in batches and bumps a generation counter, so a running
+    server can tell that its in-memory table is stale and reload it.
+    """
+
+    def __init__(self, db_path="data/property_data.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._prepared = False
+        self.ensure_schema()
+
+    def ensure_schema(self):
+        """
+        Creates the listings table if it is missing. An existing database is
+        only read: the WAL journal, the generation table and the unique link
+        index are set up by the first write, so opening the shipped database
+        leaves the file as it is. A table with repeated links (written by the
+        old full re-import) can be read but not upserted until dedupe_links()
+        has been run on it.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS properties (link TEXT, size INTEGER, "
+                "price REAL, location TEXT, amenities TEXT, description TEXT, "
+                "building_name TEXT)"
+            )
+            self.has_link_index = self._has_link_index()
+            repeated = 0 if self.has_link_index else self._repeated_links()
+            if repeated:
+                print(
+                    f"{self.db_path} repeats {repeated} links; run "
+                    f"`python listing_store.py --dedupe {self.db_path}` before upserting"
+                )
+
+    def _has_link_index(self):
+        return (
+            self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'properties_link'"
+            ).fetchone()
+            is not None
+        )
+
+    def _repeated_links(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM properties GROUP BY link HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+
+    def _prepare_writes(self):
+        """
+        Switches the file to WAL, so readers are not blocked while a batch
+        is written, and creates the generation table. Called with the lock
+        held, before the write's transaction begins.
+        """
+        if self._prepared:
+            return
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS listing_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        self._prepared = True
+
+    def _read_generation(self):
+        try:
+            return self._conn.execute(
+                "SELECT COALESCE(MAX(value), 0) FROM listing_meta WHERE key = 'generation'"
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            # Nothing has been written since the table was shipped
+            return 0
+
+    def dedupe_links(self):
+        """
+        Migration for tables with repeated links: keeps the first inserted
+        copy of each link, as the CSV import's drop_duplicates did, and adds
+        the unique index upserts need. Returns the number of rows deleted.
+        """
+        with self._lock, self._conn:
+            self._prepare_writes()
+            deleted = self._conn.execute(
+                "DELETE FROM properties WHERE rowid NOT IN "
+                "(SELECT MIN(rowid) FROM properties GROUP BY link)"
+            ).rowcount
+            if not self._has_link_index():
+                self._conn.execute("CREATE UNIQUE INDEX properties_link ON properties (link)")
+            if deleted:
+                self._conn.execute(
+                    "INSERT INTO listing_meta (key, value) VALUES ('generation', 1) "
+                    "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+                )
+        self.has_link_index = True
+        return deleted
+
+    def generation(self):
+        with self._lock:
+            return self._read_generation()
+
+    def upsert(self, records):
+        """Inserts or updates listings by link; returns the number of records written."""
+        rows = [
+            (r["link"], r["size"], r["price"], r["location"], r["amenities"], r["description"], r["building_name"])
+            for r in map(clean_record, records)
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            if not self.has_link_index:
+                if self._repeated_links():
+                    raise RuntimeError(
+                        f"{self.db_path} repeats links; run dedupe_links() before upserting"
+                    )
+                self._prepare_writes()
+                self._conn.execute("CREATE UNIQUE INDEX properties_link ON properties (link)")
+                self.has_link_index = True
+            self._prepare_writes()
+            self._conn.executemany(
+                "INSERT INTO properties (link, size, price, location, amenities, description, building_name) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (link) DO UPDATE SET size = excluded.size, price = excluded.price, "
+                "location = excluded.location, amenities = excluded.amenities, "
+                "description = excluded.description, building_name = excluded.building_name",
+                rows,
+            )
+            self._conn.execute(
+                "INSERT INTO listing_meta (key, value) VALUES ('generation', 1) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+        return len(rows)
+
+    def ingest_csv(self, csv_path, chunksize=10000):
+        """Upserts a CSV export in chunks; returns the number of records written."""
+        written = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            # The exported CSV pads its columns with spaces
+            chunk.columns = chunk.columns.str.strip()
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            written += self.upsert(chunk.to_dict("records"))
+        return written
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def iter_descriptions(self, batch_size=4096):
+        """Yields lists of (rowid, description) covering every listing, on a separate connection."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute("SELECT rowid, description FROM properties ORDER BY rowid")
+            while batch := cursor.fetchmany(batch_size):
+                yield batch
+        finally:
+            conn.close()
+
+    def load_table(self):
+        """Reads the ranking columns of every listing into a ListingTable."""
+        with self._lock:
+            generation = self._read_generation()
+            df = pd.read_sql(
+                f"SELECT rowid AS rowid, {', '.join(RANKING_COLUMNS)} FROM properties ORDER BY rowid",
+                self._conn,
+            )
+        return ListingTable.from_frame(df, store=self, generation=generation)
+
+    def fetch(self, rowids):
+        """Returns RESULT_COLUMNS for the given row IDs in that order, skipping deleted rows."""
+        rowids = [int(rowid) for rowid in rowids]
+        if not rowids:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rowid, {', '.join(RESULT_COLUMNS)} FROM properties "
+                f"WHERE rowid IN ({', '.join('?' * len(rowids))})",
+                rowids,
+            ).fetchall()
+        by_id = {row[0]: row[1:] for row in rows}
+        df = pd.DataFrame(
+            [by_id[rowid] for rowid in rowids if rowid in by_id], columns=RESULT_COLUMNS
+        )
+        df["amenities"] = df["amenities"].apply(parse_amenities)
+        return df
+
+
+if __name__ == "__main__":
+    # python listing_store.py listings.csv [data/property_data.db]
+    # python listing_store.py --dedupe [data/property_data.db]
+    store = ListingStore(sys.argv[2] if len(sys.argv) > 2 else "data/property_data.db")
+    if sys.argv[1] == "--dedupe":
+        print(f"Deleted {store.dedupe_links()} repeated listings")
+    else:
+        print(f"Upserted {store.ingest_csv(sys.argv[1])} listings")
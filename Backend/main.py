@@ -1,44 +1,94 @@
 import asyncio
+import hashlib
 import json
+import multiprocessing
 import os
 import random
-import tempfile
+import shutil
+import time
+import uuid
 import datetime
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Literal
 
 import resend
-import azure.cognitiveservices.speech as speechsdk
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, Request
+from fastapi import FastAPI, WebSocket, Request, Response
 from fastapi import FastAPI, File, UploadFile, WebSocket, Form
 from fastapi.middleware.cors import CORSMiddleware
-import google.generativeai as genai
-from pymongo import MongoClient
 from twilio.rest import Client
-from websockets import connect
 import base64 as b64
-from pydantic import BaseModel
-import pymupdf
-from deep_translator import GoogleTranslator
-
+from pydantic import BaseModel, ValidationError
+
+from artifact_cache import ArtifactCache
+from client_channel import (
+    AUDIO_FRAME,
+    BINARY_FRAMING,
+    IMAGE_FRAME,
+    AudioChunk,
+    ClientChannel,
+    decode_frame,
+)
+from gemini_live import GeminiSessionPool
+from jobs import JobQueue
+from pdf_translation import (
+    page_count,
+    translate_document_in_process,
+    translate_document_parallel,
+)
+from presence import create_presence
 from retrieval import (
-    extract_keywords_from_text,
+    extract_keywords_from_text_async,
     find_similar_properties,
-    load_cleaned_data,
+    find_similar_properties_many,
+    keyword_cache_stats,
+    load_search_engine,
 )
+from segmenter import LatencyRecorder, UtteranceSegmenter
+from translation import build_translation_service
+from otp_sender import OTPSender
+from tts_service import TTSService
+from user_store import create_user_store
+from workers import BoundedExecutor, ConcurrencyLimiter
 
 load_dotenv()
 
 app = FastAPI()
 twilio_client = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
-speech_config = speechsdk.SpeechConfig(
-    subscription=os.getenv("AZURE_SPEECH_KEY"), region=os.getenv("AZURE_SERVICE_REGION")
-)
-mongo_client = MongoClient(os.getenv("MONGO_URI"))
-db = mongo_client.estate_agent
+user_store = create_user_store(os.getenv("MONGO_URI"))
 
 db_path = "data/property_data.db"
-df = load_cleaned_data(db_path)
+search_engine = load_search_engine(db_path)
+
+# New listings are upserted into SQLite (see listing_store.py); the engine is
+# rebuilt in the background when the store's generation changes and swapped
+# in with a single assignment, so requests keep the engine they started with.
+LISTING_RELOAD_INTERVAL = float(os.getenv("LISTING_RELOAD_INTERVAL", "60"))
+
+
+async def reload_search_engine():
+    global search_engine
+    search_engine = await asyncio.to_thread(load_search_engine, db_path)
+    print(f"Reloaded {len(search_engine.listings)} listings")
+
+
+async def watch_listings():
+    while True:
+        await asyncio.sleep(LISTING_RELOAD_INTERVAL)
+        try:
+            listings = search_engine.listings
+            generation = await asyncio.to_thread(listings.store.generation)
+            if generation != listings.generation:
+                await reload_search_engine()
+        except Exception as e:
+            print(f"Error reloading listings: {e}")
+
+# Property searches are admitted PROPERTY_SEARCH_CONCURRENCY at a time and
+# ranked in a thread pool so they never block the WebSocket audio relay.
+property_search_limit = ConcurrencyLimiter(
+    "property_search", int(os.getenv("PROPERTY_SEARCH_CONCURRENCY", "16"))
+)
+ranking_pool = BoundedExecutor("ranking", int(os.getenv("RANKING_WORKERS", "4")))
 
 indian_languages = {
     "en": {"Female": "en-US-AvaNeural", "Male": "en-US-AriaNeural"},
@@ -77,189 +127,239 @@ short_code = {
     "ur": "Urdu",
 }
 
-def tts(text, language, gender="Male"):
-    speech_config.speech_synthesis_voice_name = indian_languages[language][gender]
-    audio_format = speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=tempfile.mktemp())
-    speech_config.set_speech_synthesis_output_format(audio_format)
-    speech_synthesizer = speechsdk.SpeechSynthesizer(
-        speech_config=speech_config, audio_config=audio_config
-    )
-    result = speech_synthesizer.speak_text_async(text).get()
+tts_service = TTSService(
+    os.getenv("AZURE_SPEECH_KEY"),
+    os.getenv("AZURE_SERVICE_REGION"),
+    indian_languages,
+    per_voice=int(os.getenv("TTS_SYNTHESIZERS_PER_VOICE", "2")),
+)
+
 
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        return result.audio_data
-    elif result.reason == speechsdk.ResultReason.Canceled:
-        return None
-    else:
-        return None
+translation_service = build_translation_service()
 
 
 def translate(language1, language2, text):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY_1"))
+    return translation_service.translate(language1, language2, text)
 
-    model = genai.GenerativeModel("gemini-2.0-flash-exp")
 
-    prompt = f"Translate the following {language1} text to {language2} and provide only the final text as the output nothing else: {text}"
+def send_otp(no, otp):
+    twilio_client.messages.create(
+        to=f"whatsapp:+91{no}",
+        from_=os.getenv("TWILIO_PHONE_NUMBER"),
+        content_sid="HX229f5a04fd0510ce1b071852155d3e75",
+        content_variables='{"1":"' + str(otp) + '"}',
+    )
 
-    response = model.generate_content(prompt)
 
-    return response.text
+otp_sender = OTPSender(
+    send_otp,
+    batch_size=int(os.getenv("OTP_BATCH_SIZE", "20")),
+    max_attempts=int(os.getenv("OTP_MAX_ATTEMPTS", "3")),
+)
 
 
 @app.post("/register")
 async def register(name: str, no: str, gender: str, email: str):
     otp = random.randint(100000, 999999)
-    db.users.insert_one(
-        {
-            "name": name,
-            "email": email,
-            "no": no,
-            "gender": gender,
-            "otp": otp,
-            "verified": False,
-            "role": "user",
-        }
-    )
-    twilio_client.messages.create(
-        to=f"whatsapp:+91{no}",
-        from_=os.getenv("TWILIO_PHONE_NUMBER"),
-        content_sid="HX229f5a04fd0510ce1b071852155d3e75",
-        content_variables='{"1":"' + str(otp) + '"}',
-    )
+    await user_store.register(name, email, no, gender, otp)
+    otp_sender.enqueue(no, otp)
     return {"status": "success"}
 
 @app.post("/verify")
 async def verify(no: str, otp: int):
-    user = db.users.find_one({"no": no})
-    if user["otp"] == otp:
-        db.users.update_one({"no": no}, {"$set": {"verified": True}})
+    if await user_store.verify(no, otp):
         return {"status": "success"}
     return {"status": "failure"}
 
 
 @app.post("/tts")
 async def tts_endpoint(text: str, language: str, gender: str):
-    filename = tts(text, language, gender)
-    return {"filename": filename}
-
-
-class GeminiConnection:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        self.model = "gemini-2.0-flash-exp"
-        self.uri = (
-            "wss://generativelanguage.googleapis.com/ws/"
-            "google.ai.generativelanguage.v1alpha.GenerativeService.BidiGenerateContent"
-            f"?key={self.api_key}"
-        )
-        self.ws = None
-        self.config = None
+    audio = await tts_service.synthesize(text, language, gender)
+    if audio is None:
+        return {"audio": None}
+    return {"audio": b64.b64encode(audio).decode("utf-8")}
+
+
+def parse_warm_sessions(value):
+    """Parses GEMINI_WARM_SESSIONS, e.g. "hi:Puck,ta:Puck", into client configs."""
+    configs = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        language, _, voice = item.partition(":")
+        configs.append({"language": language, "voice": voice or "Puck"})
+    return configs
+
+
+gemini_pool = GeminiSessionPool(
+    warm_per_key=int(os.getenv("GEMINI_WARM_PER_KEY", "1")),
+    max_idle=float(os.getenv("GEMINI_SESSION_MAX_IDLE", "300")),
+)
 
-    async def connect(self):
-        """Initialize connection to Gemini"""
-        self.ws = await connect(
-            self.uri, extra_headers={"Content-Type": "application/json"}
+
+# Per-client outbound queue bounds; see ClientChannel
+CLIENT_SEND_QUEUE = int(os.getenv("CLIENT_SEND_QUEUE", "64"))
+CLIENT_MAX_AUDIO_LAG = float(os.getenv("CLIENT_MAX_AUDIO_LAG", "2.0"))
+
+# Utterance segmentation timings; see UtteranceSegmenter
+SEGMENT_SILENCE = float(os.getenv("SEGMENT_SILENCE", "0.5"))
+SEGMENT_MIN_CLAUSE_CHARS = int(os.getenv("SEGMENT_MIN_CLAUSE_CHARS", "40"))
+SEGMENT_MAX_WAIT = float(os.getenv("SEGMENT_MAX_WAIT", "3.0"))
+
+# Time from the first transcript text of a segment to its first translated audio
+first_audio_latency = LatencyRecorder()
+
+# WebSockets connected to this worker
+connections: Dict[str, Dict] = {}
+
+# Clients and recommendations across all workers; see presence.py. Each
+# worker receives deliveries for its own clients on "deliver:<WORKER_ID>".
+WORKER_ID = uuid.uuid4().hex
+presence = create_presence(os.getenv("PRESENCE_URL"), WORKER_ID)
+
+# Clients that do not name a call in their config share this room
+DEFAULT_ROOM = "default"
+
+
+async def relay_translation(sender_id, room, source_language, text, started_at=None):
+    """
+    Delivers a finished utterance to the other participants of the sender's
+    room. Listeners are grouped by language so each translation and TTS runs
+    once per language, and languages are handled concurrently.
+    """
+    listeners_by_language = {}
+    for other_client_id, member in (await presence.room_members(room)).items():
+        if other_client_id != sender_id and member["config"]:
+            listeners_by_language.setdefault(
+                member["config"]["language"], []
+            ).append((other_client_id, member["worker"]))
+
+    results = await asyncio.gather(
+        *(
+            deliver_translation(source_language, language, text, listeners, started_at)
+            for language, listeners in listeners_by_language.items()
+        ),
+        return_exceptions=True,
+    )
+    for language, result in zip(listeners_by_language, results):
+        if isinstance(result, Exception):
+            print(f"Error relaying translation to {language}: {result}")
+
+
+async def deliver_translation(
+    source_language, target_language, text, listeners, started_at=None
+):
+    """Translates and speaks text in one language, streaming it to all of that language's listeners."""
+    translated_text = await asyncio.to_thread(
+        translate, source_language, target_language, text
+    )
+    print(f"Original Message {source_language}: " + text)
+    print(f"Translated Text {target_language}: " + translated_text)
+
+    sent_audio = False
+    async for chunk in tts_service.stream(translated_text, target_language):
+        if not sent_audio and started_at is not None:
+            first_audio_latency.record(time.monotonic() - started_at)
+        sent_audio = True
+        await deliver(listeners, audio=AudioChunk(pcm=chunk))
+    if sent_audio:
+        await deliver(
+            listeners,
+            message={"type": "text", "data": {"text": text, "role": "HomeConnect"}},
         )
 
-        if not self.config:
-            raise ValueError("Configuration must be set before connecting")
-
-        # Send initial setup message with configuration
-        setup_message = {
-            "setup": {
-                "model": f"models/{self.model}",
-                "generation_config": {
-                    "response_modalities": ["TEXT"],
-                    "speech_config": {
-                        "voice_config": {
-                            "prebuilt_voice_config": {
-                                "voice_name": self.config["voice"]
-                            }
-                        }
+
+async def deliver(listeners, message=None, audio=None):
+    """
+    Sends a JSON message and/or an AudioChunk to (client_id, worker) listeners:
+    directly to this worker's clients and over the presence bus to the rest.
+    """
+    clients_by_worker = {}
+    for client_id, worker in listeners:
+        clients_by_worker.setdefault(worker, []).append(client_id)
+    sends = []
+    for worker, client_ids in clients_by_worker.items():
+        if worker == WORKER_ID:
+            sends.append(deliver_local(client_ids, message, audio))
+        else:
+            sends.append(
+                presence.publish(
+                    f"deliver:{worker}",
+                    {
+                        "clients": client_ids,
+                        "message": message,
+                        "audio": audio.base64 if audio is not None else None,
                     },
-                },
-                "system_instruction": {
-                    "parts": [
-                        {
-                            "text": f"You are a translation agent. Whatever the user says, JUST TRANSLATE IT TO {self.config['language']}. Do NOT add anything else. Preserve the meaning of the sentences the user says. Do NOT repeat what the user says in the same language."
-                        }
-                    ]
-                },
-            }
-        }
-        await self.ws.send(json.dumps(setup_message))
-
-        # Wait for setup completion
-        setup_response = await self.ws.recv()
-        return setup_response
-
-    def set_config(self, config):
-        """Set configuration for the connection"""
-        self.config = config
-
-    async def send_audio(self, audio_data: str):
-        """Send audio data to Gemini"""
-        realtime_input_msg = {
-            "realtime_input": {
-                "media_chunks": [{"data": audio_data, "mime_type": "audio/pcm"}]
-            }
-        }
-        await self.ws.send(json.dumps(realtime_input_msg))
-
-    async def receive(self):
-        """Receive message from Gemini"""
-        return await self.ws.recv()
-
-    async def close(self):
-        """Close the connection"""
-        if self.ws:
-            await self.ws.close()
-
-    async def send_image(self, image_data: str):
-        """Send image data to Gemini"""
-        image_message = {
-            "realtime_input": {
-                "media_chunks": [{"data": image_data, "mime_type": "image/jpeg"}]
-            }
-        }
-        await self.ws.send(json.dumps(image_message))
-
-    async def send_text(self, text: str):
-        """Send text message to Gemini"""
-        text_message = {
-            "client_content": {
-                "turns": [{"role": "user", "parts": [{"text": text}]}],
-                "turn_complete": True,
-            }
-        }
-        await self.ws.send(json.dumps(text_message))
+                )
+            )
+    results = await asyncio.gather(*sends, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Error delivering to listeners: {result}")
+
+
+async def deliver_local(client_ids, message=None, audio=None):
+    channels = [connections[c]["channel"] for c in client_ids if c in connections]
+    if audio is not None:
+        await asyncio.gather(
+            *(channel.send_audio(audio) for channel in channels),
+            return_exceptions=True,
+        )
+    if message is not None:
+        await broadcast(channels, message)
 
 
-# Store active connections and their configurations
-connections: Dict[str, Dict] = {}
+async def receive_delivery(delivery):
+    """Handles a delivery published by another worker for clients connected here."""
+    audio = delivery.get("audio")
+    await deliver_local(
+        delivery["clients"],
+        delivery.get("message"),
+        AudioChunk(base64=audio) if audio is not None else None,
+    )
 
-# Add a dictionary to store recommendations by client_id
-client_recommendations = {}
+
+async def broadcast(channels, message):
+    """Sends a JSON message to several clients at once; one failed send does not stop the rest."""
+    await asyncio.gather(
+        *(channel.send_json(message) for channel in channels), return_exceptions=True
+    )
 
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await websocket.accept()
+    gemini = None
+    channel = None
+    segmenter = None
     try:
-        # Create new Gemini connection for this client
-        gemini = GeminiConnection()
-        connections[client_id] = {"ws": websocket, "config": None}
+        channel = ClientChannel(
+            websocket,
+            max_queue=CLIENT_SEND_QUEUE,
+            max_audio_lag=CLIENT_MAX_AUDIO_LAG,
+        )
+        channel.start()
+        connections[client_id] = {"ws": websocket, "channel": channel, "config": None}
         # Wait for initial configuration
         config_data = await websocket.receive_json()
         if config_data.get("type") != "config":
             raise ValueError("First message must be configuration")
         # Set the configuration
         config = config_data.get("config", {})
-        gemini.set_config(config)
         connections[client_id]["config"] = config
-        # Initialize Gemini connection
-        await gemini.connect()
+        room = str(config.get("room") or DEFAULT_ROOM)
+        await presence.join(
+            client_id, {"config": config, "worker": WORKER_ID, "room": room}
+        )
+        # Clients opt into binary PCM frames; JSON with base64 stays the default
+        if config.get("audio_framing") == BINARY_FRAMING:
+            channel.framing = BINARY_FRAMING
+        await channel.send_json(
+            {
+                "type": "config_ack",
+                "data": {"audio_framing": channel.framing, "room": room},
+            }
+        )
+        # Attach to a pre-warmed Gemini session for this language and voice
+        gemini = await gemini_pool.acquire(config)
 
         # Handle bidirectional communication
         async def receive_from_client():
@@ -276,6 +376,15 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                             print("Received disconnect message")
                             await gemini.close()
                             return
+                        if message.get("bytes") is not None:
+                            frame_type, _, payload = decode_frame(message["bytes"])
+                            if frame_type == AUDIO_FRAME:
+                                await gemini.send_audio_bytes(payload)
+                            elif frame_type == IMAGE_FRAME:
+                                await gemini.send_image_bytes(payload)
+                            else:
+                                print(f"Unknown frame type: {frame_type}")
+                            continue
                         message_content = json.loads(message["text"])
                         msg_type = message_content["type"]
                         if msg_type == "audio":
@@ -301,9 +410,29 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 print(f"Fatal error in receive_from_client: {str(e)}")
                 return
 
+        async def emit_segment(segment):
+            await channel.send_json(
+                {"type": "text", "data": {"text": segment.text, "role": "You"}}
+            )
+            await relay_translation(
+                client_id,
+                room,
+                gemini.config["language"],
+                segment.text,
+                segment.started_at,
+            )
+
+        # Translate stable sentences and clauses as they arrive instead of
+        # waiting for a pause after the whole utterance
+        segmenter = UtteranceSegmenter(
+            emit_segment,
+            silence=SEGMENT_SILENCE,
+            min_clause_chars=SEGMENT_MIN_CLAUSE_CHARS,
+            max_wait=SEGMENT_MAX_WAIT,
+        )
+        segmenter.start()
+
         async def receive_from_gemini():
-            pending_task = None
-            pending_text = ""
             try:
                 while True:
                     if websocket.client_state.value == 3:  # WebSocket.CLOSED
@@ -317,94 +446,20 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                             for p in parts:
                                 if "inlineData" in p:
                                     audio_data = p["inlineData"]["data"]
-                                    await websocket.send_json(
-                                        {"type": "audio", "data": audio_data}
+                                    await channel.send_audio(
+                                        AudioChunk(base64=audio_data)
                                     )
                         else:
                             for p in parts:
                                 if "text" in p:
-                                    pending_text += p["text"]
-                                    if pending_task is not None:
-                                        pending_task.cancel()
-
-                                    async def process_debounced_text():
-                                        nonlocal pending_text, pending_task
-                                        try:
-                                            await asyncio.sleep(0.5)
-                                            text_to_convert = pending_text
-                                            pending_text = ""
-                                            pending_task = None
-                                            await websocket.send_json(
-                                                {
-                                                    "type": "text",
-                                                    "data": {
-                                                        "text": text_to_convert,
-                                                        "role": "You",
-                                                    },
-                                                }
-                                            )
-                                            for (
-                                                other_client_id,
-                                                other_conn,
-                                            ) in connections.items():
-                                                if other_client_id != client_id:
-                                                    other_language = other_conn[
-                                                        "config"
-                                                    ]["language"]
-                                                    translated_text = translate(
-                                                        gemini.config["language"],
-                                                        other_language,
-                                                        text_to_convert,
-                                                    )
-                                                    print(
-                                                        f"Original Message {gemini.config['language']}: "
-                                                        + text_to_convert
-                                                    )
-                                                    print(
-                                                        f"Translated Text {other_language}: "
-                                                        + translated_text
-                                                    )
-                                                    translated_audio = tts(
-                                                        translated_text,
-                                                        other_language,
-                                                    )
-                                                    if translated_audio:
-                                                        encoded_translated_audio = (
-                                                            b64.b64encode(
-                                                                translated_audio
-                                                            ).decode("utf-8")
-                                                        )
-                                                        await other_conn[
-                                                            "ws"
-                                                        ].send_json(
-                                                            {
-                                                                "type": "audio",
-                                                                "data": encoded_translated_audio,
-                                                            }
-                                                        )
-                                                        await other_conn[
-                                                            "ws"
-                                                        ].send_json(
-                                                            {
-                                                                "type": "text",
-                                                                "data": {
-                                                                    "text": text_to_convert,
-                                                                    "role": "HomeConnect",
-                                                                },
-                                                            }
-                                                        )
-                                        except asyncio.CancelledError:
-                                            return
-
-                                    pending_task = asyncio.create_task(
-                                        process_debounced_text()
-                                    )
+                                    segmenter.feed(p["text"])
                     except KeyError:
                         pass
                     # Handle turn completion
                     try:
                         if response["serverContent"]["turnComplete"]:
-                            await websocket.send_json(
+                            segmenter.turn_complete()
+                            await channel.send_json(
                                 {"type": "turn_complete", "data": True}
                             )
                     except KeyError:
@@ -420,11 +475,19 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         print(f"WebSocket error: {e}")
     finally:
         # Cleanup
+        if segmenter is not None:
+            await segmenter.close()
+        if gemini is not None:
+            await gemini_pool.release(gemini)
+        if channel is not None:
+            await channel.close()
         if client_id in connections:
             del connections[client_id]
-        # Remove stored recommendations when client disconnects
-        if client_id in client_recommendations:
-            del client_recommendations[client_id]
+        # Also removes the client's stored recommendations
+        try:
+            await presence.leave(client_id)
+        except Exception as e:
+            print(f"Error removing {client_id} from presence: {e}")
 
 
 # Define models for request bodies
@@ -434,19 +497,35 @@ class TextRequest(BaseModel):
 
 class PropertyRequest(BaseModel):
     transcript: str
+    ranking: Literal["tfidf", "bitset"] = "tfidf"
+    # Rerank by similarity of listing descriptions to the transcript
+    semantic: bool = False
 
 
-# Add new endpoints
-@app.post("/properties")
-async def get_properties(request: PropertyRequest):
-    extracted_data = extract_keywords_from_text(request.transcript)
-    properties = find_similar_properties(
-        df,
-        extracted_data["size"],
-        extracted_data["price"],
-        extracted_data["location"],
-        extracted_data["amenities"],
-    )
+class PropertyRequirements(BaseModel):
+    """An already parsed requirement set, as returned in "requirements"."""
+
+    size: int | None = None
+    price: float | None = None
+    location: str | None = None
+    amenities: list[str] = []
+    ranking: Literal["tfidf", "bitset"] | None = None
+    description: str | None = None
+
+
+class BatchPropertyRequest(BaseModel):
+    transcripts: list[str] = []
+    # Validated one by one (see PropertyRequirements), so an invalid set
+    # gets its own message instead of rejecting the whole batch
+    requirements: list[dict] = []
+    # Default for queries that do not set their own "ranking"
+    ranking: Literal["tfidf", "bitset"] = "tfidf"
+    # Rerank transcripts' results by description similarity; requirement
+    # dicts can carry their own "description" instead
+    semantic: bool = False
+
+
+def format_properties_response(extracted_data, properties):
     if hasattr(properties, "to_dict"):
         properties = properties.to_dict("records")
     elif isinstance(properties, str):
@@ -454,13 +533,122 @@ async def get_properties(request: PropertyRequest):
     return {"requirements": extracted_data, "properties": properties}
 
 
+# Add new endpoints
+@app.post("/properties")
+async def get_properties(request: PropertyRequest):
+    engine = search_engine
+    async with property_search_limit:
+        extracted_data = await extract_keywords_from_text_async(
+            request.transcript, engine=engine
+        )
+        properties = await ranking_pool.run(
+            find_similar_properties,
+            engine.df,
+            extracted_data["size"],
+            extracted_data["price"],
+            extracted_data["location"],
+            extracted_data["amenities"],
+            engine=engine,
+            ranking=request.ranking,
+            description=request.transcript if request.semantic else None,
+        )
+    return format_properties_response(extracted_data, properties)
+
+
+@app.post("/properties/batch")
+async def get_properties_batch(request: BatchPropertyRequest):
+    """
+    Ranks properties for several transcripts and/or already parsed requirement
+    sets, returning one /properties response per query.
+    """
+    engine = search_engine
+    async with property_search_limit:
+        extracted = list(
+            await asyncio.gather(
+                *(
+                    extract_keywords_from_text_async(t, engine=engine)
+                    for t in request.transcripts
+                )
+            )
+        )
+        queries = [
+            dict(
+                query,
+                ranking=request.ranking,
+                description=transcript if request.semantic else None,
+            )
+            for query, transcript in zip(extracted, request.transcripts)
+        ]
+        extracted += request.requirements
+        invalid = {}
+        for requirement in request.requirements:
+            try:
+                query = PropertyRequirements.model_validate(requirement).model_dump()
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                invalid[len(queries) + len(invalid)] = f"Invalid requirements: {field}: {error['msg']}"
+                continue
+            queries.append(dict(query, ranking=query["ranking"] or request.ranking))
+        results = iter(
+            await ranking_pool.run(
+                find_similar_properties_many, engine.df, queries, engine=engine
+            )
+        )
+        results = [
+            invalid[i] if i in invalid else next(results) for i in range(len(extracted))
+        ]
+    return {
+        "results": [
+            format_properties_response(extracted_data, properties)
+            for extracted_data, properties in zip(extracted, results)
+        ]
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Cache and queue counters used to size the backend."""
+    return {
+        "keyword_cache": keyword_cache_stats(),
+        "property_search": property_search_limit.stats(),
+        "description_index": search_engine.descriptions.stats()
+        if search_engine.descriptions is not None
+        else None,
+        "ranking_pool": ranking_pool.stats(),
+        "translation": translation_service.stats(),
+        "pdf_jobs": await asyncio.to_thread(pdf_jobs.stats),
+        "translated_pdfs": translated_pdfs.stats(),
+        "otp_sender": otp_sender.stats(),
+        "gemini_sessions": gemini_pool.stats(),
+        "first_audio_latency": first_audio_latency.stats(),
+        "presence": presence.stats(),
+        "connections": {
+            client_id: conn["channel"].stats() for client_id, conn in connections.items()
+        },
+    }
+
+
 # Add this endpoint to get recommendations for a specific client
 @app.get("/recommendations/{client_id}")
-async def get_recommendations(client_id: str):
-    """Get property recommendations for a specific client."""
-    if client_id not in client_recommendations:
+async def get_recommendations(client_id: str, request: Request):
+    """
+    Get property recommendations for a specific client. A poll with an
+    If-None-Match matching the snapshot's ETag gets a 304.
+    """
+    recommendations = await presence.get_recommendations(client_id)
+    if recommendations is None:
         return {"requirements": None, "properties": []}
-    return client_recommendations[client_id]
+    version, body = recommendations
+    # Versions restart at 1 with the in-memory backend, so the ETag also
+    # hashes the body (which carries a timestamp) to stay unique across restarts
+    digest = hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+    etag = f'"{version}-{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 # Add an endpoint to store recommendations from the agent
@@ -471,23 +659,38 @@ async def store_recommendations(request: Request):
     requirements = data.get("requirements")
     properties = data.get("properties")
 
-    # Find all connected users (non-agents)
+    # Recommendations go to the users in the agent's call: the room named in
+    # the request, else the room the agent is connected to
+    room = data.get("room")
+    if room is None:
+        agent = await presence.member(agent_id) if agent_id else None
+        room = agent["room"] if agent is not None else DEFAULT_ROOM
+
+    # Find connected users (non-agents) in the room on every worker
     user_clients = []
-    for client_id, conn in connections.items():
-        if conn["config"]["role"] == "user":
-            user_clients.append(client_id)
+    for client_id, member in (await presence.room_members(str(room))).items():
+        if member["config"].get("role") == "user":
+            user_clients.append((client_id, member["worker"]))
 
     if not user_clients:
         return {"status": "error", "message": "No connected users found"}
 
-    # Store recommendations for all connected users
-    for user_id in user_clients:
-        client_recommendations[user_id] = {
-            "requirements": requirements,
-            "properties": properties,
-            "from_agent": agent_id,
-            "timestamp": datetime.datetime.now().isoformat(),
-        }
+    # Store one snapshot that all the users refer to, then push it to them
+    recommendations = {
+        "version": await presence.new_version(),
+        "requirements": requirements,
+        "properties": properties,
+        "from_agent": agent_id,
+        "timestamp": datetime.datetime.now().isoformat(),
+    }
+    await presence.put_snapshot(
+        recommendations["version"],
+        json.dumps(recommendations),
+        [client_id for client_id, _ in user_clients],
+    )
+    await deliver(
+        user_clients, message={"type": "recommendations", "data": recommendations}
+    )
 
     return {
         "status": "success",
@@ -496,29 +699,11 @@ async def store_recommendations(request: Request):
 
 resend.api_key = os.getenv("RESEND_API_KEY")
 
-async def translate_pdf(language: str, email: str):
-    if f"translated_{language}.pdf" not in os.listdir():
-        WHITE = pymupdf.pdfcolor["white"]
-        textflags = pymupdf.TEXT_DEHYPHENATE
-        to_korean = GoogleTranslator(source="en", target=language)
-        doc = pymupdf.open("temp.pdf")
-        ocg_xref = doc.add_ocg(short_code[language], on=True)
-
-        for page in doc:
-            blocks = page.get_text("blocks", flags=textflags)
-            for block in blocks:
-                bbox = block[:4]
-                text = block[4] 
-
-                korean = to_korean.translate(text)
-
-                page.draw_rect(bbox, fill=WHITE, oc=ocg_xref)
-
-                page.insert_htmlbox(bbox, korean, css="* {font-family: sans-serif;}", oc=ocg_xref)
-        doc.subset_fonts()
-        doc.ez_save(f"translated_{language}.pdf")
-
-    # Resend
+def send_translated_pdf(path, language, email):
+    # Resend takes attachment content as a base64 string; a list of ints
+    # costs a Python object per byte of the PDF.
+    with open(path, "rb") as f:
+        content = b64.b64encode(f.read()).decode("ascii")
     params: resend.Emails.SendParams = {
         "from": os.getenv("RESEND_EMAIL"),
         "to": email,
@@ -526,14 +711,131 @@ async def translate_pdf(language: str, email: str):
         "text": "Here is your translated PDF",
         "attachments": [
             {
-                "content": list(open(f"translated_{language}.pdf", "rb").read()),
+                "content": content,
                 "filename": f"translated_{language}.pdf",
                 "type": "application/pdf",
             },
         ],
     }
-    email: resend.Email = resend.Emails.send(params)
-    
+    return resend.Emails.send(params)
+
+
+# PyMuPDF work holds the GIL, so documents are rendered in separate processes.
+PDF_JOB_PROCESSES = int(os.getenv("PDF_JOB_PROCESSES", str(os.cpu_count() or 2)))
+PDF_PAGES_PER_PART = int(os.getenv("PDF_PAGES_PER_PART", "4"))
+pdf_process_pool = ProcessPoolExecutor(
+    max_workers=PDF_JOB_PROCESSES,
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+
+translated_pdfs = ArtifactCache(
+    os.getenv("PDF_CACHE_DIR", "data/translated_pdfs"),
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(1 << 30))),
+    max_age=float(os.getenv("PDF_CACHE_MAX_AGE", str(7 * 24 * 3600))),
+)
+
+
+async def run_translation_job(job_id, payload, job_dir, set_stage):
+    """Translates an uploaded PDF in the process pool, unless already cached, and emails the result."""
+    language = payload["language"]
+    report = {"cached": True}
+    cached_path = translated_pdfs.get(payload["sha256"], language)
+    if cached_path is None:
+        output_path = os.path.join(job_dir, f"translated_{language}.pdf")
+        input_path = os.path.join(job_dir, "input.pdf")
+        translation_workers = int(os.getenv("PDF_TRANSLATION_WORKERS", "4"))
+        await set_stage("translating")
+        # Long documents are split into page ranges rendered in parallel.
+        parts = await asyncio.to_thread(page_count, input_path) // PDF_PAGES_PER_PART
+        if parts > 1 and PDF_JOB_PROCESSES > 1:
+            report = await translate_document_parallel(
+                pdf_process_pool,
+                input_path,
+                output_path,
+                language,
+                short_code[language],
+                min(parts, PDF_JOB_PROCESSES),
+                translation_workers,
+            )
+        else:
+            report = await asyncio.get_running_loop().run_in_executor(
+                pdf_process_pool,
+                translate_document_in_process,
+                input_path,
+                output_path,
+                language,
+                short_code[language],
+                translation_workers,
+            )
+        print(f"Translated PDF to {language}: {report}")
+        cached_path = await asyncio.to_thread(
+            translated_pdfs.put, payload["sha256"], language, output_path
+        )
+    await set_stage("sending")
+    await asyncio.to_thread(send_translated_pdf, cached_path, language, payload["email"])
+    return report
+
+
+pdf_jobs = JobQueue(
+    os.getenv("PDF_JOB_DB", "data/jobs.db"),
+    os.getenv("PDF_JOB_DIR", "data/jobs"),
+    run_translation_job,
+    concurrency=int(os.getenv("PDF_JOB_CONCURRENCY", "2")),
+    max_attempts=int(os.getenv("PDF_JOB_MAX_ATTEMPTS", "3")),
+    worker_id=WORKER_ID,
+    lease=float(os.getenv("PDF_JOB_LEASE", "60")),
+)
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    try:
+        await user_store.ensure_indexes()
+    except Exception as e:
+        print(f"Could not create user indexes: {e}")
+    otp_sender.start()
+    await presence.start()
+    await presence.subscribe(f"deliver:{WORKER_ID}", receive_delivery)
+    pdf_jobs.start()
+    gemini_pool.start(parse_warm_sessions(os.getenv("GEMINI_WARM_SESSIONS", "")))
+    app.state.listing_watcher = asyncio.create_task(watch_listings())
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    app.state.listing_watcher.cancel()
+    await otp_sender.stop()
+    await pdf_jobs.stop()
+    await gemini_pool.stop()
+    await presence.stop()
+    pdf_process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Uploads are copied to the job directory in chunks and hashed on the way in
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def save_upload(src, path, max_bytes=MAX_UPLOAD_BYTES, chunk_size=UPLOAD_CHUNK_BYTES):
+    """
+    Streams an uploaded file to path and returns its SHA-256. Raises
+    ValueError if it is not a PDF or is larger than max_bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as dst:
+        while chunk := src.read(chunk_size):
+            if size == 0 and not chunk.startswith(b"%PDF-"):
+                raise ValueError("File is not a PDF")
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"File is larger than {max_bytes} bytes")
+            digest.update(chunk)
+            dst.write(chunk)
+    if size == 0:
+        raise ValueError("File is empty")
+    return digest.hexdigest()
 
 
 @app.post("/upload")
@@ -544,13 +846,53 @@ async def upload_file(
 ):
     if not email or not language:
         return {"success": False, "error": "Email and language must be provided"}
-    
-    file.filename = "temp.pdf"
-    with open(file.filename, "wb") as f:
-        f.write(file.file.read())
-    
-    await translate_pdf(language, email)
-    return {"success": True, "message": f"PDF will be translated to {language} and sent to {email}"}
+    if language not in short_code:
+        return {"success": False, "error": f"Unsupported language: {language}"}
+
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        return {"success": False, "error": f"File is larger than {MAX_UPLOAD_BYTES} bytes"}
+
+    job_id = pdf_jobs.create()
+    job_dir = pdf_jobs.job_dir(job_id)
+    try:
+        sha256 = await asyncio.to_thread(
+            save_upload, file.file, os.path.join(job_dir, "input.pdf")
+        )
+    except ValueError as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return {"success": False, "error": str(e)}
+    await pdf_jobs.submit(
+        job_id,
+        {
+            "language": language,
+            "email": email,
+            "sha256": sha256,
+        },
+    )
+    return {
+        "success": True,
+        "job_id": job_id,
+        "message": f"PDF will be translated to {language} and sent to {email}",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, current stage and attempt count of a background job."""
+    job = await pdf_jobs.get(job_id)
+    if job is None:
+        return {"success": False, "error": "Job not found"}
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
 
 app.add_middleware(
     CORSMiddleware,
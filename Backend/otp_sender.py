@@ -0,0 +1,70 @@
+import asyncio
+
+
+class OTPSender:
+    """
+    Delivers OTP messages in the background so /register returns immediately.
+    Queued messages are drained in batches of up to batch_size and sent
+    concurrently in worker threads; failed sends are retried with exponential
+    backoff up to max_attempts times.
+
+    send is a blocking callable (no, otp), e.g. a Twilio messages.create call.
+    """
+
+    def __init__(self, send, batch_size=20, max_attempts=3, retry_delay=2.0):
+        self.send = send
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._queue = None
+        self._worker = None
+        self._retries = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in [self._worker, *self._retries]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(self._worker, *self._retries, return_exceptions=True)
+
+    def enqueue(self, no, otp, attempt=1):
+        self._queue.put_nowait((no, otp, attempt))
+
+    async def _send_one(self, no, otp, attempt):
+        try:
+            await asyncio.to_thread(self.send, no, otp)
+            self.sent += 1
+        except Exception as e:
+            print(f"OTP delivery to {no} failed (attempt {attempt}): {e}")
+            if attempt >= self.max_attempts:
+                self.failed += 1
+                return
+            self.retried += 1
+            task = asyncio.create_task(self._retry_later(no, otp, attempt + 1))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, no, otp, attempt):
+        await asyncio.sleep(self.retry_delay * 2 ** (attempt - 2))
+        self.enqueue(no, otp, attempt)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await asyncio.gather(*(self._send_one(*message) for message in batch))
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
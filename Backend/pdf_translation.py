@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+import mmap
+import os
+import re
+import time
+
+import pymupdf
+
+from translation import build_translation_service, normalize_text
+
+WHITE = pymupdf.pdfcolor["white"]
+TEXT_FLAGS = pymupdf.TEXT_DEHYPHENATE
+CSS = "* {font-family: sans-serif;}"
+
+# Built on first use inside each worker process.
+_translation_service = None
+
+
+@contextlib.contextmanager
+def open_mapped(path):
+    """
+    Opens a PDF over a read-only memory map of the file, so MuPDF reads it
+    from the page cache instead of holding a private copy on the heap.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            doc = pymupdf.open(stream=view, filetype="pdf")
+            try:
+                yield doc
+            finally:
+                doc.close()
+        finally:
+            view.release()
+
+
+def extract_blocks(doc):
+    """Returns (page number, bbox, text) for every text block in the document."""
+    blocks = []
+    for page in doc:
+        for block in page.get_text("blocks", flags=TEXT_FLAGS):
+            blocks.append((page.number, block[:4], block[4]))
+    return blocks
+
+
+def render_translations(doc, blocks, translations, ocg_xref):
+    """Covers each original block and writes its translation on the optional-content layer."""
+    for page_number, bbox, text in blocks:
+        page = doc[page_number]
+        translated = translations.get(normalize_text(text), text)
+        page.draw_rect(bbox, fill=WHITE, oc=ocg_xref)
+        page.insert_htmlbox(bbox, translated, css=CSS, oc=ocg_xref)
+
+
+def translate_document(
+    input_path,
+    output_path,
+    language,
+    layer_name,
+    translation_service,
+    max_workers=4,
+    pages=None,
+    subset_fonts=True,
+):
+    """
+    Translates a PDF from English in stages: extract every block, translate the
+    distinct strings in concurrent batches, then overlay and save. When pages
+    is given only those pages are kept. Returns the seconds spent in each stage
+    along with block counts.
+    """
+    report = {}
+    with open_mapped(input_path) as doc:
+        start = time.perf_counter()
+        if pages is not None:
+            doc.select(list(pages))
+        blocks = extract_blocks(doc)
+        report["extract"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        translations = translation_service.translate_many(
+            "en",
+            language,
+            [text for _, _, text in blocks],
+            backend="google",
+            max_workers=max_workers,
+        )
+        report["translate"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ocg_xref = doc.add_ocg(layer_name, on=True)
+        render_translations(doc, blocks, translations, ocg_xref)
+        report["render"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if subset_fonts:
+            doc.subset_fonts()
+        doc.ez_save(output_path)
+        report["save"] = time.perf_counter() - start
+
+    report["blocks"] = len(blocks)
+    report["unique_texts"] = len(translations)
+    return report
+
+
+def translate_document_in_process(
+    input_path,
+    output_path,
+    language,
+    layer_name,
+    max_workers=4,
+    pages=None,
+    subset_fonts=True,
+):
+    """Process-pool entry point for translate_document using this process's own translation service."""
+    global _translation_service
+    if _translation_service is None:
+        _translation_service = build_translation_service()
+    return translate_document(
+        input_path,
+        output_path,
+        language,
+        layer_name,
+        _translation_service,
+        max_workers,
+        pages,
+        subset_fonts,
+    )
+
+
+def page_count(path):
+    with open_mapped(path) as doc:
+        return doc.page_count
+
+
+def page_ranges(count, parts):
+    """Splits count pages into at most `parts` contiguous, nearly equal ranges."""
+    parts = max(1, min(parts, count))
+    bounds = [round(i * count / parts) for i in range(parts + 1)]
+    return [range(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+def merge_parts(part_paths, output_path, layer_name):
+    """
+    Concatenates translated page ranges into one PDF. Every part carries its
+    own copy of the translation layer; references to those copies are pointed
+    at the first part's layer so the merged file has a single toggleable layer.
+    """
+    doc = pymupdf.open(part_paths[0])
+    for path in part_paths[1:]:
+        with pymupdf.open(path) as part:
+            doc.insert_pdf(part)
+
+    layer_xrefs = [xref for xref, ocg in doc.get_ocgs().items() if ocg["name"] == layer_name]
+    if layer_xrefs:
+        layer_xref = layer_xrefs[0]
+        copies = [
+            xref
+            for xref in range(1, doc.xref_length())
+            if xref != layer_xref
+            and doc.xref_get_key(xref, "Type") == ("name", "/OCG")
+            and doc.xref_get_key(xref, "Name") == ("string", layer_name)
+        ]
+        if copies:
+            reference = re.compile(r"\b(?:%s) 0 R\b" % "|".join(map(str, copies)))
+            for xref in range(1, doc.xref_length()):
+                if xref in copies:
+                    continue
+                obj = doc.xref_object(xref, compressed=True)
+                updated = reference.sub(f"{layer_xref} 0 R", obj)
+                if updated != obj:
+                    doc.update_object(xref, updated)
+
+    doc.subset_fonts()
+    doc.ez_save(output_path)
+    doc.close()
+
+
+async def translate_document_parallel(
+    executor, input_path, output_path, language, layer_name, parts, max_workers=4
+):
+    """
+    Translates page ranges of a PDF concurrently in a process pool and merges
+    them into output_path. Returns per-range reports plus the merge time.
+    """
+    loop = asyncio.get_running_loop()
+    work_dir = os.path.dirname(output_path)
+    ranges = page_ranges(page_count(input_path), parts)
+    part_paths = [
+        os.path.join(work_dir, f"part_{i}_{language}.pdf") for i in range(len(ranges))
+    ]
+    reports = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                executor,
+                translate_document_in_process,
+                input_path,
+                part_path,
+                language,
+                layer_name,
+                max_workers,
+                pages,
+                False,
+            )
+            for pages, part_path in zip(ranges, part_paths)
+        )
+    )
+
+    start = time.perf_counter()
+    await loop.run_in_executor(executor, merge_parts, part_paths, output_path, layer_name)
+    for part_path in part_paths:
+        os.remove(part_path)
+    return {
+        "parts": [
+            dict(report, pages=[pages.start, pages.stop])
+            for pages, report in zip(ranges, reports)
+        ],
+        "merge": time.perf_counter() - start,
+    }
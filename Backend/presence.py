@@ -0,0 +1,319 @@
+import asyncio
+import itertools
+import json
+
+
+class InMemoryPresence:
+    """
+    Connected clients, recommendation snapshots and a publish/subscribe bus,
+    kept in this process. The default when the backend runs as a single
+    worker.
+
+    Members are dicts of {"config": <client config>, "worker": <worker id>,
+    "room": <call id>} and are indexed by room, so routing only looks at the
+    members of one call. Recommendations are stored once per
+    /store-recommendations call as an immutable JSON snapshot with a version
+    number; clients only hold the version, and a snapshot is dropped once no
+    client refers to it. Handlers are async callables taking the published
+    message.
+    """
+
+    def __init__(self):
+        self.published = 0
+        self.received = 0
+        self._members = {}
+        self._rooms = {}
+        self._versions = itertools.count(1)
+        # version -> [snapshot body, number of clients referring to it]
+        self._snapshots = {}
+        self._references = {}
+        self._handlers = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self._handlers.clear()
+
+    async def join(self, client_id, member):
+        self._remove_from_room(client_id)
+        self._members[client_id] = member
+        self._rooms.setdefault(member["room"], {})[client_id] = member
+
+    async def leave(self, client_id):
+        self._remove_from_room(client_id)
+        self._members.pop(client_id, None)
+        self._release_snapshot(client_id)
+
+    def _remove_from_room(self, client_id):
+        member = self._members.get(client_id)
+        if member is None:
+            return
+        room = self._rooms.get(member["room"], {})
+        room.pop(client_id, None)
+        if not room:
+            self._rooms.pop(member["room"], None)
+
+    async def member(self, client_id):
+        return self._members.get(client_id)
+
+    async def room_members(self, room):
+        return dict(self._rooms.get(room, {}))
+
+    async def new_version(self):
+        return next(self._versions)
+
+    async def put_snapshot(self, version, body, client_ids):
+        """Stores a snapshot's JSON body and points each client at it."""
+        self._snapshots[version] = [body, 0]
+        for client_id in client_ids:
+            self._release_snapshot(client_id)
+            self._references[client_id] = version
+            self._snapshots[version][1] += 1
+        if not self._snapshots[version][1]:
+            del self._snapshots[version]
+
+    async def get_recommendations(self, client_id):
+        """Returns (version, JSON body) of the client's snapshot, or None."""
+        version = self._references.get(client_id)
+        if version is None:
+            return None
+        return version, self._snapshots[version][0]
+
+    def _release_snapshot(self, client_id):
+        version = self._references.pop(client_id, None)
+        if version is None:
+            return
+        snapshot = self._snapshots[version]
+        snapshot[1] -= 1
+        if not snapshot[1]:
+            del self._snapshots[version]
+
+    async def subscribe(self, topic, handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic, message):
+        self.published += 1
+        for handler in self._handlers.get(topic, []):
+            self.received += 1
+            await handler(message)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "members": len(self._members),
+            "rooms": len(self._rooms),
+            "snapshots": len(self._snapshots),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class RedisPresence:
+    """
+    The same interface backed by Redis, so clients of one call can be spread
+    over several workers and hosts. Members are JSON values in a hash of all
+    members plus one hash per room, and messages go through Redis pub/sub.
+    Snapshot versions come from INCR; snapshots and the per-client version
+    references are plain keys that expire after snapshot_ttl seconds.
+
+    Each worker refreshes a heartbeat key, which expires worker_ttl seconds
+    after its last refresh. Members of a worker without a heartbeat (one
+    that crashed) are left out of room_members and swept from the hashes,
+    so nothing is translated for them or sent to them.
+
+    client is a redis.asyncio.Redis (or a compatible stand-in such as
+    fakeredis.aioredis.FakeRedis).
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix="estate",
+        snapshot_ttl=24 * 3600,
+        worker_id=None,
+        heartbeat_interval=10,
+        worker_ttl=30,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.snapshot_ttl = snapshot_ttl
+        self.worker_id = worker_id
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_ttl = worker_ttl
+        self.published = 0
+        self.received = 0
+        self.swept = 0
+        self._members_key = f"{prefix}:members"
+        self._handlers = {}
+        self._pubsub = None
+        self._listener = None
+        self._heartbeat = None
+
+    def _room_key(self, room):
+        return f"{self.prefix}:room:{room}"
+
+    def _recommendations_key(self, client_id):
+        return f"{self.prefix}:recommendations:{client_id}"
+
+    def _snapshot_key(self, version):
+        return f"{self.prefix}:snapshot:{version}"
+
+    def _topic(self, topic):
+        return f"{self.prefix}:{topic}"
+
+    def _worker_key(self, worker):
+        return f"{self.prefix}:worker:{worker}"
+
+    async def start(self):
+        self._pubsub = self.client.pubsub()
+        if self.worker_id is not None:
+            await self.client.set(self._worker_key(self.worker_id), 1, ex=self.worker_ttl)
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        for task in (self._listener, self._heartbeat):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self.worker_id is not None:
+            await self.client.delete(self._worker_key(self.worker_id))
+        await self.client.aclose()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.client.set(self._worker_key(self.worker_id), 1, ex=self.worker_ttl)
+                await self.sweep()
+            except Exception as e:
+                print(f"Presence heartbeat failed: {e}")
+
+    async def _live_workers(self, workers):
+        workers = list(workers)
+        if not workers:
+            return set()
+        beats = await self.client.mget([self._worker_key(w) for w in workers])
+        return {w for w, beat in zip(workers, beats) if beat is not None or w == self.worker_id}
+
+    async def sweep(self):
+        """Removes members whose worker has no heartbeat; returns how many were removed."""
+        members = {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in (await self.client.hgetall(self._members_key)).items()
+        }
+        live = await self._live_workers({m["worker"] for m in members.values()})
+        ghosts = {c: m for c, m in members.items() if m["worker"] not in live}
+        if not ghosts:
+            return 0
+        async with self.client.pipeline(transaction=True) as pipe:
+            for client_id, member in ghosts.items():
+                pipe.hdel(self._room_key(member["room"]), client_id)
+                pipe.hdel(self._members_key, client_id)
+                pipe.delete(self._recommendations_key(client_id))
+            await pipe.execute()
+        self.swept += len(ghosts)
+        return len(ghosts)
+
+    async def join(self, client_id, member):
+        previous = await self.member(client_id)
+        value = json.dumps(member)
+        async with self.client.pipeline(transaction=True) as pipe:
+            if previous is not None and previous["room"] != member["room"]:
+                pipe.hdel(self._room_key(previous["room"]), client_id)
+            pipe.hset(self._members_key, client_id, value)
+            pipe.hset(self._room_key(member["room"]), client_id, value)
+            await pipe.execute()
+
+    async def leave(self, client_id):
+        member = await self.member(client_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            if member is not None:
+                pipe.hdel(self._room_key(member["room"]), client_id)
+            pipe.hdel(self._members_key, client_id)
+            pipe.delete(self._recommendations_key(client_id))
+            await pipe.execute()
+
+    async def member(self, client_id):
+        value = await self.client.hget(self._members_key, client_id)
+        return json.loads(value) if value is not None else None
+
+    async def room_members(self, room):
+        """Members of room whose worker is alive."""
+        members = {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in (await self.client.hgetall(self._room_key(room))).items()
+        }
+        live = await self._live_workers({m["worker"] for m in members.values()})
+        return {c: m for c, m in members.items() if m["worker"] in live}
+
+    async def new_version(self):
+        return await self.client.incr(f"{self.prefix}:snapshot_version")
+
+    async def put_snapshot(self, version, body, client_ids):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self._snapshot_key(version), body, ex=self.snapshot_ttl)
+            for client_id in client_ids:
+                pipe.set(
+                    self._recommendations_key(client_id), version, ex=self.snapshot_ttl
+                )
+            await pipe.execute()
+
+    async def get_recommendations(self, client_id):
+        version = await self.client.get(self._recommendations_key(client_id))
+        if version is None:
+            return None
+        body = await self.client.get(self._snapshot_key(int(version)))
+        if body is None:
+            return None
+        return int(version), body.decode() if isinstance(body, bytes) else body
+
+    async def subscribe(self, topic, handler):
+        channel = self._topic(topic)
+        self._handlers.setdefault(channel, []).append(handler)
+        await self._pubsub.subscribe(channel)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def publish(self, topic, message):
+        self.published += 1
+        await self.client.publish(self._topic(topic), json.dumps(message))
+
+    async def _listen(self):
+        async for item in self._pubsub.listen():
+            if item["type"] != "message":
+                continue
+            channel = item["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            message = json.loads(item["data"])
+            for handler in self._handlers.get(channel, []):
+                self.received += 1
+                try:
+                    await handler(message)
+                except Exception as e:
+                    print(f"Error handling message on {channel}: {e}")
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "published": self.published,
+            "received": self.received,
+            "swept": self.swept,
+        }
+
+
+def create_presence(url, worker_id=None):
+    """
+    Builds the presence backend for PRESENCE_URL. "memory://" (or no URL)
+    keeps everything in this process; a redis:// or rediss:// URL shares
+    presence and delivery between workers, with worker_id's heartbeat.
+    """
+    if not url or url.startswith("memory://"):
+        return InMemoryPresence()
+
+    import redis.asyncio as redis
+
+    return RedisPresence(redis.from_url(url), worker_id=worker_id)
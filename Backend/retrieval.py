@@ -1,19 +1,37 @@
 import pandas as pd
 import ast
-import faiss
-import numpy as np
 import sqlite3
-from sklearn.feature_extraction.text import TfidfVectorizer
 import google.generativeai as genai
 import re
 from dotenv import load_dotenv
 import os
 
+from cache import SQLiteCache, TieredCache, TTLCache
+from description_index import DescriptionIndex, create_embedder
+from keyword_parser import normalize_transcript, parse_requirements
+from listing_store import ListingStore
+from search_engine import PropertySearchEngine
+
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 model = genai.GenerativeModel("gemini-2.0-flash-lite-001")
 
+# Extracted requirements keyed by normalized transcript. Set KEYWORD_CACHE_DB
+# to an empty string to keep the cache in memory only.
+keyword_cache_db = os.getenv("KEYWORD_CACHE_DB", "data/keyword_cache.db")
+keyword_cache = TieredCache(
+    TTLCache(
+        maxsize=int(os.getenv("KEYWORD_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("KEYWORD_CACHE_TTL", "3600")),
+    ),
+    # Versioned so entries from an older fast-path parser are not served
+    SQLiteCache(keyword_cache_db, table="keywords_v2", ttl=7 * 24 * 3600)
+    if keyword_cache_db
+    else None,
+)
+keyword_stats = {"fast_path": 0, "llm": 0}
+
 
 def preprocess_data(df):
     """Preprocesses the property data by converting amenities to lists and standardizing location format."""
@@ -28,13 +46,9 @@ def preprocess_data(df):
 
 
 def save_cleaned_data(csv_path, db_path="data/property_data.db"):
-    """Loads raw CSV, preprocesses data, and stores it in SQLite."""
-    raw_df = pd.read_csv(csv_path)
-    df_cleaned = preprocess_data(raw_df)
-    conn = sqlite3.connect(db_path)
-    df_cleaned.to_sql("properties", conn, if_exists="replace", index=False)
-    conn.close()
-    print("Data cleaned and saved successfully!")
+    """Loads raw CSV, preprocesses data, and upserts it into SQLite by link."""
+    written = ListingStore(db_path).ingest_csv(csv_path)
+    print(f"Data cleaned and saved successfully! ({written} listings)")
 
 
 def load_cleaned_data(db_path="data/property_data.db"):
@@ -58,62 +72,146 @@ def get_user_input():
     return user_size, user_price, user_location, user_amenities
 
 
-def find_similar_properties(df, user_size, user_price, user_location, user_amenities):
-    """Finds the top 5 non-duplicate properties based on size, location, price, and amenities."""
-    df_filtered = df[df["size"] == user_size].copy()
-    if df_filtered.empty:
-        return "No properties found with the given size."
+def load_search_engine(db_path="data/property_data.db"):
+    """
+    Loads the ranking columns of the listings and the persisted amenity index
+    built from them. Descriptions are read from SQLite only for returned results.
 
-    exact_match = df_filtered[df_filtered["location"] == user_location.lower()]
-    partial_match = df_filtered[
-        df_filtered["location"].str.contains(user_location.lower(), na=False)
-    ]
-    df_filtered = pd.concat([exact_match, partial_match]).drop_duplicates(
-        subset=["link"], keep="first"
+    With DESCRIPTION_SEARCH=1 the persisted description index is loaded and
+    updated for new or changed listings, embedding with the local
+    DESCRIPTION_MODEL if set and installed, else hashed n-grams.
+    """
+    store = ListingStore(db_path)
+    engine = PropertySearchEngine.load_or_build(store.load_table(), db_path)
+    if os.getenv("DESCRIPTION_SEARCH", "0") == "1":
+        engine.descriptions = DescriptionIndex.load_or_build(
+            store, db_path, create_embedder(os.getenv("DESCRIPTION_MODEL"))
+        )
+        engine.rerank_depth = int(os.getenv("DESCRIPTION_RERANK_DEPTH", "50"))
+    return engine
+
+
+def find_similar_properties(
+    df,
+    user_size,
+    user_price,
+    user_location,
+    user_amenities,
+    engine=None,
+    ranking="tfidf",
+    description=None,
+):
+    """
+    Finds the top 5 non-duplicate properties based on size, location, price, and amenities.
+    ranking picks the amenity ranking: "tfidf" (FAISS) or "bitset" (exact overlap);
+    description, if the engine has a description index, reranks by similarity to it.
+    """
+    if engine is None:
+        engine = PropertySearchEngine(df)
+    return engine.search(
+        user_size,
+        user_price,
+        user_location,
+        user_amenities,
+        ranking=ranking,
+        description=description,
     )
-    if df_filtered.empty:
-        return "No properties found in the specified location."
 
-    upper_price_limit = user_price * 1.05
-    df_filtered = df_filtered[df_filtered["price"] <= upper_price_limit]
-    if df_filtered.empty:
-        return "No properties found within the price range."
 
-    df_filtered["amenities_str"] = df_filtered["amenities"].apply(lambda x: " ".join(x))
-    user_amenities_str = " ".join(user_amenities)
+def find_similar_properties_many(df, queries, engine=None):
+    """
+    Runs find_similar_properties for several parsed requirement sets at once.
+    Each query is a dict with size, price, location, amenities and optionally
+    ranking and description.
+    """
+    if engine is None:
+        engine = PropertySearchEngine(df)
+    return engine.search_many(queries)
 
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(
-        df_filtered["amenities_str"].tolist() + [user_amenities_str]
-    )
-    embeddings = tfidf_matrix[:-1].toarray().astype("float32")
-    user_embedding = tfidf_matrix[-1].toarray().astype("float32")
-
-    d = embeddings.shape[1]
-    index = faiss.IndexFlatL2(d)
-    index.add(embeddings)
-    _, indices = index.search(user_embedding, 10)
-
-    top_results = df_filtered.iloc[indices[0]].drop_duplicates(subset=["link"]).head(5)
-    return top_results[
-        [
-            "link",
-            "size",
-            "price",
-            "location",
-            "amenities",
-            "description",
-            "building_name",
-        ]
-    ]
-
-
-def extract_keywords_from_text(user_text):
+
+def extract_keywords_from_text(user_text, engine=None):
     """
     Extracts size, price, location, and amenities from a given text using Google Gemini.
-    Returns structured data.
+    Returns structured data. Results are cached by normalized transcript, and
+    simple requests whose location is known to the engine skip the LLM entirely.
+    """
+    key, extracted_data = cached_or_parsed_keywords(user_text, engine)
+    if extracted_data is not None:
+        return extracted_data
+    response = model.generate_content(keyword_prompt(user_text))
+    return store_llm_keywords(key, parse_keyword_response(response.text))
+
+
+async def extract_keywords_from_text_async(user_text, engine=None):
+    """
+    Same as extract_keywords_from_text, but awaits Gemini instead of blocking
+    the event loop, and reads and writes the SQLite cache tier in a thread.
     """
-    prompt = f"""
+    key = normalize_transcript(user_text)
+    cached = await keyword_cache.get_async(key)
+    if cached is not None:
+        return copy_keywords(cached)
+
+    extracted_data = parsed_keywords(user_text, engine)
+    if extracted_data is None:
+        response = await model.generate_content_async(keyword_prompt(user_text))
+        extracted_data = parse_keyword_response(response.text)
+        keyword_stats["llm"] += 1
+        if not cacheable_keywords(extracted_data):
+            return copy_keywords(extracted_data)
+    await keyword_cache.set_async(key, extracted_data)
+    return copy_keywords(extracted_data)
+
+
+def cached_or_parsed_keywords(user_text, engine=None):
+    """Returns (cache key, requirements) from the cache or the rule-based parser; requirements is None when the LLM is needed."""
+    key = normalize_transcript(user_text)
+    cached = keyword_cache.get(key)
+    if cached is not None:
+        return key, copy_keywords(cached)
+
+    extracted_data = parsed_keywords(user_text, engine)
+    if extracted_data is None:
+        return key, None
+    keyword_cache.set(key, extracted_data)
+    return key, copy_keywords(extracted_data)
+
+
+def parsed_keywords(user_text, engine=None):
+    """Requirements from the rule-based parser, or None when the LLM is needed."""
+    location_matcher = engine.filters.match_location if engine is not None else None
+    extracted_data = parse_requirements(user_text, location_matcher)
+    if extracted_data is not None:
+        keyword_stats["fast_path"] += 1
+    return extracted_data
+
+
+def cacheable_keywords(extracted_data):
+    """An LLM extraction is only cached if it found something."""
+    return extracted_data.get("size") is not None or extracted_data.get("location") is not None
+
+
+def copy_keywords(extracted_data):
+    """A copy callers can modify without touching the cached entry."""
+    return dict(extracted_data, amenities=list(extracted_data.get("amenities") or []))
+
+
+def store_llm_keywords(key, extracted_data):
+    """Caches an LLM extraction unless it came back empty."""
+    keyword_stats["llm"] += 1
+    if cacheable_keywords(extracted_data):
+        keyword_cache.set(key, extracted_data)
+    return copy_keywords(extracted_data)
+
+
+def keyword_cache_stats():
+    """Returns hit/miss counters for the keyword cache and how requests were parsed."""
+    return dict(keyword_cache.stats(), **keyword_stats)
+
+
+def keyword_prompt(user_text):
+    """Builds the Gemini prompt for extracting requirements from a transcript."""
+    return f"""
     Extract the following details from the given text and return them in JSON format in ENGLISH ONLY DONT KEEP ANY LOCAL LANGUAGE IN OUTPUT:
     - **Size**: The apartment size in numeric format. Eg, For 1BHK give output as 1. 
     - **Price**: The budget mentioned (assumed in INR unless stated otherwise).
@@ -130,10 +228,12 @@ def extract_keywords_from_text(user_text):
 
     Text: "{user_text}"
     """
-    response = model.generate_content(prompt)
 
+
+def parse_keyword_response(response_text):
+    """Pulls the requirements dict out of a Gemini response."""
     # Extract JSON output using regex to handle inconsistencies
-    match = re.search(r"\{.*\}", response.text, re.DOTALL)
+    match = re.search(r"\{.*\}", response_text, re.DOTALL)
     if match:
         extracted_data = eval(match.group())  # Convert JSON string to dict
     else:
@@ -149,12 +249,17 @@ def extract_keywords_from_text(user_text):
 
 if __name__ == "__main__":
     db_path = "data/property_data.db"
-    df = load_cleaned_data(db_path)
+    engine = load_search_engine(db_path)
 
     user_query = "Looking for a 2BHK in Vikhroli within 1,20,000 budget."
-    result = extract_keywords_from_text(user_query)
+    result = extract_keywords_from_text(user_query, engine=engine)
 
     top_properties = find_similar_properties(
-        df, result["size"], result["price"], result["location"], result["amenities"]
+        engine.df,
+        result["size"],
+        result["price"],
+        result["location"],
+        result["amenities"],
+        engine=engine,
     )
     print(top_properties)
@@ -0,0 +1,240 @@
+import os
+import pickle
+
+import faiss
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from amenity_ranker import AmenityBitsetRanker
+from filter_index import FilterIndex, normalize_location
+from listing_store import RESULT_COLUMNS, ListingTable
+
+
+def index_paths(db_path):
+    """Returns the (faiss index, vectorizer) paths stored next to the SQLite database."""
+    base = os.path.splitext(db_path)[0]
+    return f"{base}.amenities.faiss", f"{base}.amenities.pkl"
+
+
+def missing_requirements(user_size, user_price, user_location):
+    """Returns a message naming the requirements that are None, or None if all are set."""
+    missing = [
+        name
+        for name, value in (("size", user_size), ("price", user_price), ("location", user_location))
+        if value is None
+    ]
+    if missing:
+        return f"Could not search without the {', '.join(missing)}."
+    return None
+
+
+class PropertySearchEngine:
+    """
+    Amenity search over the full listing table.
+    The TF-IDF vocabulary and the FAISS index are fitted once; queries only
+    transform the user's amenity string and search the candidate rows by ID.
+    listings is a ListingTable, or a DataFrame with an amenities list column.
+
+    Searches rank with ranking="tfidf" (the FAISS index) by default, or
+    ranking="bitset" for exact IDF-weighted amenity overlap with synonyms
+    (see AmenityBitsetRanker).
+
+    When a DescriptionIndex is attached as descriptions, searches given a
+    description query take the top rerank_depth amenity matches (or every
+    filtered candidate if rerank_depth is 0) and reorder them by description
+    similarity.
+    """
+
+    RANKINGS = ("tfidf", "bitset")
+
+    def __init__(self, listings, vectorizer=None, index=None):
+        if not isinstance(listings, ListingTable):
+            listings = ListingTable.from_frame(listings)
+        self.listings = listings
+        self.df = listings.df
+        if vectorizer is None or index is None:
+            vectorizer, index = self._fit(listings)
+        self.vectorizer = vectorizer
+        self.index = index
+        self.filters = FilterIndex(self.df)
+        self.bitset_ranker = AmenityBitsetRanker(listings)
+        self.descriptions = None
+        self.rerank_depth = 50
+
+    @staticmethod
+    def _fit(listings):
+        """Fits the vectorizer on every listing and builds the shared L2 index."""
+        amenities_str = [" ".join(amenities) for amenities in listings.amenity_lists()]
+        vectorizer = TfidfVectorizer()
+        embeddings = vectorizer.fit_transform(amenities_str).toarray().astype("float32")
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(embeddings)
+        return vectorizer, index
+
+    @classmethod
+    def load_or_build(cls, listings, db_path="data/property_data.db"):
+        """Loads the persisted index for this data, rebuilding and saving it if missing or stale."""
+        if not isinstance(listings, ListingTable):
+            listings = ListingTable.from_frame(listings)
+        index_path, vectorizer_path = index_paths(db_path)
+        fingerprint = listings.fingerprint()
+        if os.path.exists(index_path) and os.path.exists(vectorizer_path):
+            try:
+                with open(vectorizer_path, "rb") as f:
+                    saved = pickle.load(f)
+                if saved["fingerprint"] == fingerprint:
+                    index = faiss.read_index(index_path)
+                    return cls(listings, vectorizer=saved["vectorizer"], index=index)
+            except Exception as e:
+                print(f"Could not load amenity index, rebuilding: {e}")
+
+        engine = cls(listings)
+        engine.save(db_path, fingerprint)
+        return engine
+
+    def save(self, db_path="data/property_data.db", fingerprint=None):
+        """Writes the index and the fitted vectorizer next to the database."""
+        index_path, vectorizer_path = index_paths(db_path)
+        if fingerprint is None:
+            fingerprint = self.listings.fingerprint()
+        faiss.write_index(self.index, index_path)
+        with open(vectorizer_path, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "vectorizer": self.vectorizer}, f)
+
+    def embed_query(self, user_amenities):
+        """Transforms the user's amenities with the shared vocabulary."""
+        return self.embed_queries([user_amenities])
+
+    def embed_queries(self, amenity_lists):
+        """Transforms several amenity lists in one vectorizer call."""
+        amenity_strs = [" ".join(amenities or []) for amenities in amenity_lists]
+        return self.vectorizer.transform(amenity_strs).toarray().astype("float32")
+
+    def amenity_distances(self, embeddings, candidates):
+        """
+        Squared L2 distances from each query embedding to the candidates'
+        stored vectors. Computed in float64 and rounded, so listings at equal
+        distance tie exactly whether one query or a batch is scored.
+        """
+        vectors = self.index.reconstruct_batch(candidates).astype("float64")
+        embeddings = embeddings.astype("float64")
+        distances = (
+            (embeddings * embeddings).sum(axis=1)[:, None]
+            + (vectors * vectors).sum(axis=1)[None, :]
+            - 2 * embeddings @ vectors.T
+        )
+        return np.round(distances, 6)
+
+    def rank(self, candidates, user_amenities, k=10):
+        """Returns candidate row positions ordered by amenity distance, ties by row position."""
+        if len(candidates) == 0:
+            return np.empty(0, dtype="int64")
+        candidates = np.ascontiguousarray(candidates, dtype="int64")
+        distances = self.amenity_distances(self.embed_query(user_amenities), candidates)[0]
+        return candidates[np.lexsort((candidates, distances))[:k]]
+
+    def search(
+        self,
+        user_size,
+        user_price,
+        user_location,
+        user_amenities,
+        k=10,
+        ranking="tfidf",
+        description=None,
+    ):
+        """Finds the top 5 non-duplicate properties based on size, location, price, and amenities."""
+        if ranking not in self.RANKINGS:
+            raise ValueError(f"Unknown ranking: {ranking}")
+        missing = missing_requirements(user_size, user_price, user_location)
+        if missing:
+            return missing
+        candidates = self.filters.candidates(user_size, user_price, user_location)
+        if isinstance(candidates, str):
+            return candidates
+        rerank = bool(description) and self.descriptions is not None
+        depth = k
+        if rerank:
+            depth = self.rerank_depth or len(candidates)
+        if rerank and not self.rerank_depth:
+            positions = candidates
+        elif ranking == "bitset":
+            positions = self.bitset_ranker.rank(candidates, user_amenities, depth)
+        else:
+            positions = self.rank(candidates, user_amenities, depth)
+        if rerank:
+            rowids = self.df["rowid"].to_numpy()[positions]
+            positions = positions[self.descriptions.rerank(rowids, description, k)]
+        return self._top_results(positions)
+
+    def search_many(self, queries, k=10):
+        """
+        Runs several searches at once. Queries sharing a size and location share
+        one filter pass, and all of their amenity vectors are scored against the
+        candidates in a single matrix operation. Each query is a dict with
+        size, price, location, amenities and optionally ranking; results keep
+        the order of queries. Bitset-ranked queries and queries with a
+        description to rerank by run one by one. A query missing its size,
+        price or location gets a message instead of failing the batch.
+        """
+        results = [None] * len(queries)
+        groups = {}
+        for i, query in enumerate(queries):
+            missing = missing_requirements(
+                query.get("size"), query.get("price"), query.get("location")
+            )
+            if missing:
+                results[i] = missing
+                continue
+            if query.get("ranking", "tfidf") != "tfidf" or query.get("description"):
+                results[i] = self.search(
+                    query["size"],
+                    query["price"],
+                    query["location"],
+                    query.get("amenities"),
+                    k,
+                    query.get("ranking", "tfidf"),
+                    query.get("description"),
+                )
+                continue
+            key = (query["size"], normalize_location(query["location"]))
+            groups.setdefault(key, []).append(i)
+
+        query_embeddings = self.embed_queries([query.get("amenities") for query in queries])
+        all_prices = self.df["price"].to_numpy(dtype="float64")
+
+        for (size, location), members in groups.items():
+            max_price = max(queries[i]["price"] for i in members)
+            candidates = self.filters.candidates(size, max_price, location)
+            if isinstance(candidates, str):
+                for i in members:
+                    results[i] = candidates
+                continue
+
+            candidates = np.ascontiguousarray(candidates, dtype="int64")
+            distances = self.amenity_distances(query_embeddings[members], candidates)
+            limits = np.array([queries[i]["price"] * 1.05 for i in members])
+            allowed = all_prices[candidates][None, :] <= limits[:, None]
+            distances[~allowed] = np.inf
+
+            for row, i in enumerate(members):
+                allowed_count = int(allowed[row].sum())
+                if allowed_count == 0:
+                    results[i] = "No properties found within the price range."
+                    continue
+                order = np.lexsort((candidates, distances[row]))[: min(k, allowed_count)]
+                results[i] = self._top_results(candidates[order])
+        return results
+
+    def _top_results(self, positions):
+        """Returns the first 5 distinct listings at the given row positions."""
+        links = self.df["link"].to_numpy()
+        seen = set()
+        top = []
+        for position in positions:
+            if links[position] not in seen:
+                seen.add(links[position])
+                top.append(position)
+                if len(top) == 5:
+                    break
+        return self.listings.details(np.array(top, dtype="int64"))[RESULT_COLUMNS]
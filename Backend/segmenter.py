@@ -0,0 +1,148 @@
+import asyncio
+import re
+import time
+from collections import deque
+
+# Sentence ends: ?, !, the Devanagari danda, or a period that does not follow a
+# digit (so "1.5" is not split), each followed by whitespace or the end of text.
+SENTENCE_END = re.compile(r"(?:[?!।]+|(?<!\d)\.+)(?=\s|$)")
+CLAUSE_END = re.compile(r"[,;:]+(?=\s)")
+
+
+class Segment:
+    __slots__ = ("text", "started_at", "reason")
+
+    def __init__(self, text, started_at, reason):
+        self.text = text
+        self.started_at = started_at
+        self.reason = reason
+
+
+class UtteranceSegmenter:
+    """
+    Splits streamed transcript text into segments to translate.
+    Complete sentences are emitted as soon as their punctuation arrives,
+    clauses once they are at least min_clause_chars long, and whatever is
+    left after `silence` seconds without new text or when the model reports
+    turnComplete. Text older than max_wait is cut at the last word boundary
+    so long monologues start translating while the speaker is still talking.
+    Segments are passed to the async on_segment callback one at a time, in order.
+    """
+
+    def __init__(self, on_segment, silence=0.5, min_clause_chars=40, max_wait=3.0):
+        self.on_segment = on_segment
+        self.silence = silence
+        self.min_clause_chars = min_clause_chars
+        self.max_wait = max_wait
+        self._buffer = ""
+        self._started_at = None
+        self._last_text_at = None
+        self._timer = None
+        self._segments = asyncio.Queue()
+        self._consumer = None
+
+    def start(self):
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+
+    def feed(self, text):
+        now = time.monotonic()
+        if not self._buffer.strip():
+            self._started_at = now
+        self._last_text_at = now
+        self._buffer += text
+        self._split()
+        self._arm()
+
+    def turn_complete(self):
+        self._emit(len(self._buffer), "turn")
+        self._arm()
+
+    def _split(self):
+        sentence_end = None
+        for match in SENTENCE_END.finditer(self._buffer):
+            sentence_end = match.end()
+        if sentence_end is not None:
+            self._emit(sentence_end, "sentence")
+            return
+        clause_end = None
+        for match in CLAUSE_END.finditer(self._buffer):
+            clause_end = match.end()
+        if clause_end is not None and clause_end >= self.min_clause_chars:
+            self._emit(clause_end, "clause")
+
+    def _emit(self, end, reason):
+        text = self._buffer[:end].strip()
+        self._buffer = self._buffer[end:]
+        if text:
+            self._segments.put_nowait(Segment(text, self._started_at, reason))
+        self._started_at = time.monotonic() if self._buffer.strip() else None
+
+    def _arm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._started_at is None:
+            return
+        now = time.monotonic()
+        delay = min(
+            self._last_text_at + self.silence - now,
+            self._started_at + self.max_wait - now,
+        )
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        if self._started_at is None:
+            return
+        if time.monotonic() - self._last_text_at >= self.silence:
+            self._emit(len(self._buffer), "silence")
+        else:
+            cut = self._buffer.rstrip().rfind(" ")
+            if cut > 0:
+                self._emit(cut, "max_wait")
+            else:
+                # A single unfinished word: give it until the next silence.
+                self._started_at = time.monotonic()
+        self._arm()
+
+    async def _consume(self):
+        while True:
+            segment = await self._segments.get()
+            try:
+                await self.on_segment(segment)
+            except Exception as e:
+                print(f"Error processing segment: {e}")
+
+
+class LatencyRecorder:
+    """Keeps the most recent latency samples and reports percentiles."""
+
+    def __init__(self, size=1000):
+        self.count = 0
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self.count += 1
+        self._samples.append(seconds)
+
+    def stats(self):
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count}
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "count": self.count,
+            "p50_seconds": percentile(0.5),
+            "p95_seconds": percentile(0.95),
+            "max_seconds": samples[-1],
+        }
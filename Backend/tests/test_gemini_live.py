@@ -0,0 +1,118 @@
+import asyncio
+
+from websockets.exceptions import ConnectionClosed
+
+import gemini_live
+from gemini_live import GeminiConnection, GeminiSessionPool
+
+
+class FakeSocket:
+    """Enough of a websockets client connection to drop and replace."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+        self.dropped = asyncio.Event()
+        self.replies = asyncio.Queue()
+
+    def drop(self):
+        self.dropped.set()
+
+    async def send(self, message):
+        if self.dropped.is_set() or self.closed:
+            raise ConnectionClosed(None, None)
+        self.sent.append(message)
+
+    async def recv(self):
+        get = asyncio.ensure_future(self.replies.get())
+        drop = asyncio.ensure_future(self.dropped.wait())
+        await asyncio.wait([get, drop], return_when=asyncio.FIRST_COMPLETED)
+        if get.done():
+            drop.cancel()
+            return get.result()
+        get.cancel()
+        raise ConnectionClosed(None, None)
+
+    async def close(self):
+        self.closed = True
+        self.dropped.set()
+
+
+def run(test):
+    asyncio.run(test())
+
+
+def test_concurrent_drop_reconnects_once(monkeypatch):
+    sockets = []
+
+    async def fake_connect(uri, **kwargs):
+        await asyncio.sleep(0.01)
+        socket = FakeSocket()
+        # The setup reply
+        socket.replies.put_nowait("{}")
+        sockets.append(socket)
+        return socket
+
+    monkeypatch.setattr(gemini_live, "connect", fake_connect)
+
+    async def test():
+        connection = GeminiConnection()
+        connection.set_config({"language": "hi", "voice": "Puck"})
+        await connection.connect()
+        receiving = asyncio.create_task(connection.receive())
+        await asyncio.sleep(0)
+
+        sockets[0].drop()
+        await connection.send_text("hello")
+        sockets[-1].replies.put_nowait("reply")
+
+        assert await receiving == "reply"
+        assert connection.reconnects == 1
+        assert len(sockets) == 2
+        assert sockets[0].closed
+        assert connection.ws is sockets[1]
+        assert any("hello" in message for message in sockets[1].sent)
+
+    run(test)
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def set_config(self, config):
+        pass
+
+    async def connect(self):
+        await asyncio.sleep(0.01)
+
+    def is_open(self):
+        return not self.closed
+
+    async def ping(self, timeout=10):
+        return not self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+def test_sessions_warmed_for_an_expired_key_are_closed():
+    sessions = []
+
+    def factory():
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    async def test():
+        pool = GeminiSessionPool(warm_per_key=2, key_ttl=0, connection_factory=factory)
+        pool.warm({"language": "hi", "voice": "Puck"})
+        # Stop warming the key while the first session is still connecting
+        await asyncio.sleep(0.001)
+        await pool._check()
+        await asyncio.gather(*pool._refills.values())
+
+        assert sessions
+        assert all(session.closed for session in sessions)
+        assert pool._ready == {}
+
+    run(test)
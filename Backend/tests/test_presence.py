@@ -0,0 +1,128 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from presence import RedisPresence
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def worker(server, worker_id):
+    return RedisPresence(
+        fakeredis.FakeAsyncRedis(server=server),
+        worker_id=worker_id,
+        heartbeat_interval=3600,
+    )
+
+
+def member(worker_id, room, role="user", language="en"):
+    return {"config": {"role": role, "language": language}, "worker": worker_id, "room": room}
+
+
+def run(test):
+    asyncio.run(test())
+
+
+def test_join_and_room_members(server):
+    async def test():
+        a, b = worker(server, "a"), worker(server, "b")
+        await a.start()
+        await b.start()
+        await a.join("alice", member("a", "call-1"))
+        await b.join("bob", member("b", "call-1", language="hi"))
+        await b.join("carol", member("b", "call-2"))
+
+        assert set(await a.room_members("call-1")) == {"alice", "bob"}
+        assert (await b.member("alice"))["worker"] == "a"
+
+        # Moving to another room leaves the old one
+        await a.join("alice", member("a", "call-2"))
+        assert set(await b.room_members("call-1")) == {"bob"}
+        assert set(await b.room_members("call-2")) == {"alice", "carol"}
+
+        await a.leave("alice")
+        assert await b.member("alice") is None
+        assert set(await b.room_members("call-2")) == {"carol"}
+        await a.stop()
+        await b.stop()
+
+    run(test)
+
+
+def test_snapshot_references(server):
+    async def test():
+        a, b = worker(server, "a"), worker(server, "b")
+        await a.start()
+        await b.start()
+        first = await a.new_version()
+        second = await b.new_version()
+        assert second == first + 1
+
+        await a.put_snapshot(second, '{"version": 2}', ["alice", "bob"])
+        assert await b.get_recommendations("alice") == (second, '{"version": 2}')
+        assert await a.get_recommendations("bob") == (second, '{"version": 2}')
+        assert await a.get_recommendations("carol") is None
+
+        await a.join("alice", member("a", "call-1"))
+        await a.leave("alice")
+        assert await b.get_recommendations("alice") is None
+        assert await b.get_recommendations("bob") == (second, '{"version": 2}')
+        await a.stop()
+        await b.stop()
+
+    run(test)
+
+
+def test_deliver_between_workers(server):
+    async def test():
+        a, b = worker(server, "a"), worker(server, "b")
+        await a.start()
+        await b.start()
+        received = asyncio.Queue()
+
+        async def handler(message):
+            await received.put(message)
+
+        await a.subscribe("deliver:a", handler)
+        delivery = {"clients": ["alice"], "message": {"type": "text"}, "audio": None}
+        # The subscription is registered asynchronously; publish until it lands
+        for _ in range(50):
+            await b.publish("deliver:a", delivery)
+            try:
+                assert await asyncio.wait_for(received.get(), 0.1) == delivery
+                break
+            except asyncio.TimeoutError:
+                continue
+        else:
+            pytest.fail("delivery was not received")
+        assert a.received >= 1
+        await a.stop()
+        await b.stop()
+
+    run(test)
+
+
+def test_members_of_dead_worker_are_dropped(server):
+    async def test():
+        a, b = worker(server, "a"), worker(server, "b")
+        await a.start()
+        await b.start()
+        await a.join("alice", member("a", "call-1"))
+        await b.join("bob", member("b", "call-1"))
+        await a.put_snapshot(await a.new_version(), "{}", ["bob"])
+
+        # Worker b crashes: its heartbeat expires without a graceful stop
+        await b.client.delete(b._worker_key("b"))
+        assert set(await a.room_members("call-1")) == {"alice"}
+
+        assert await a.sweep() == 1
+        assert await a.member("bob") is None
+        assert await a.get_recommendations("bob") is None
+        assert set(await a.room_members("call-1")) == {"alice"}
+        await a.stop()
+
+    run(test)
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from deep_translator import GoogleTranslator
+from google import genai
+
+from cache import SQLiteCache, TieredCache, TTLCache
+
+
+def normalize_text(text):
+    """Collapses whitespace so the same phrase always maps to the same cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def translation_key(source, target, text):
+    """Content-addressed cache key for a (source, target, normalized text) triple."""
+    digest = hashlib.sha256(f"{source}\x00{target}\x00{text}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranslationService:
+    """
+    Shared translation front end for the live relay and PDF translation.
+    Results are cached by (source language, target language, normalized text)
+    regardless of which backend produced them, and a single Gemini client is
+    reused for the life of the process.
+    """
+
+    def __init__(self, api_key, cache, model="gemini-2.0-flash-exp"):
+        self.model = model
+        self.cache = cache
+        self._client = genai.Client(api_key=api_key)
+        # GoogleTranslator keeps request state on the instance, so each thread gets its own.
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._latency = {}
+        # Joined Google batches whose lines did not split back one per text
+        self.split_fallbacks = 0
+
+    def _google_translator(self, source, target):
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(
+                source=source, target=target
+            )
+        return translator
+
+    def _call_backend(self, backend, source, target, text):
+        if backend == "google":
+            return self._google_translator(source, target).translate(text)
+        prompt = f"Translate the following {source} text to {target} and provide only the final text as the output nothing else: {text}"
+        response = self._client.models.generate_content(model=self.model, contents=prompt)
+        return response.text
+
+    def _call_backend_batch(self, backend, source, target, texts):
+        start = time.perf_counter()
+        if backend == "google":
+            translated = self._google_batch(source, target, texts)
+        else:
+            translated = [self._call_backend(backend, source, target, t) for t in texts]
+        self._record_latency(backend, time.perf_counter() - start)
+        return translated
+
+    def _google_batch(self, source, target, texts):
+        """
+        Translates texts in one request by joining them with newlines, which
+        normalized texts never contain. deep_translator's translate_batch
+        would send one request per text. If the translation does not come
+        back with one line per text, the texts are sent one by one instead.
+        """
+        translator = self._google_translator(source, target)
+        if len(texts) > 1:
+            lines = (translator.translate("\n".join(texts)) or "").split("\n")
+            if len(lines) == len(texts):
+                return [line.strip() for line in lines]
+            with self._lock:
+                self.split_fallbacks += 1
+        return [translator.translate(text) for text in texts]
+
+    def _record_latency(self, backend, seconds):
+        with self._lock:
+            stats = self._latency.setdefault(
+                backend, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def translate(self, source, target, text, backend="gemini"):
+        """Translates text, using the cache first. backend is "gemini" or "google"."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return text
+        key = translation_key(source, target, normalized)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        translated = self._call_backend(backend, source, target, normalized)
+        self._record_latency(backend, time.perf_counter() - start)
+        if translated:
+            self.cache.set(key, translated)
+        return translated
+
+    def translate_many(
+        self, source, target, texts, backend="google", batch_chars=4000, max_workers=4
+    ):
+        """
+        Translates many strings at once. Identical strings are translated once,
+        cache misses are grouped into batches of at most batch_chars characters
+        that each go out as one request, and up to max_workers batches are in
+        flight at a time. Returns a dict
+        from normalized text to translation.
+        """
+        results = {}
+        misses = []
+        for normalized in dict.fromkeys(normalize_text(t) for t in texts):
+            if not normalized:
+                continue
+            cached = self.cache.get(translation_key(source, target, normalized))
+            if cached is not None:
+                results[normalized] = cached
+            else:
+                misses.append(normalized)
+
+        batches = []
+        batch, size = [], 0
+        for text in misses:
+            if batch and size + len(text) > batch_chars:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(text)
+            # Plus the newline joining it to the rest of the batch
+            size += len(text) + 1
+        if batch:
+            batches.append(batch)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            translated_batches = pool.map(
+                lambda b: self._call_backend_batch(backend, source, target, b), batches
+            )
+            for batch, translated in zip(batches, translated_batches):
+                for text, translation in zip(batch, translated):
+                    if translation:
+                        self.cache.set(translation_key(source, target, text), translation)
+                    results[text] = translation or text
+        return results
+
+    def stats(self):
+        with self._lock:
+            latency = {
+                backend: dict(
+                    stats,
+                    avg_seconds=stats["total_seconds"] / stats["calls"]
+                    if stats["calls"]
+                    else 0.0,
+                )
+                for backend, stats in self._latency.items()
+            }
+        return {
+            "cache": self.cache.stats(),
+            "backend_latency": latency,
+            "split_fallbacks": self.split_fallbacks,
+        }
+
+
+def build_translation_service():
+    """Creates a TranslationService configured from the environment."""
+    cache_db = os.getenv("TRANSLATION_CACHE_DB", "data/translation_cache.db")
+    return TranslationService(
+        os.getenv("GEMINI_API_KEY_1") or os.getenv("GEMINI_API_KEY"),
+        TieredCache(
+            TTLCache(
+                maxsize=int(os.getenv("TRANSLATION_CACHE_SIZE", "4096")),
+                ttl=float(os.getenv("TRANSLATION_CACHE_TTL", "86400")),
+            ),
+            SQLiteCache(cache_db, table="translations") if cache_db else None,
+        ),
+    )
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import azure.cognitiveservices.speech as speechsdk
+
+AUDIO_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm
+# 100 ms of 24 kHz 16-bit mono PCM
+CHUNK_SIZE = 4800
+
+
+class TTSService:
+    """
+    Azure text-to-speech with a small pool of synthesizers per voice.
+    Each voice has its own SpeechConfig, so concurrent requests for different
+    languages never change each other's settings, and audio is streamed as
+    raw PCM chunks while synthesis is still running.
+    """
+
+    def __init__(self, subscription, region, voices, per_voice=2, max_workers=8):
+        self.subscription = subscription
+        self.region = region
+        self.voices = voices
+        self.per_voice = per_voice
+        self._idle = {}
+        self._created = {}
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+    def voice_name(self, language, gender="Male"):
+        return self.voices[language][gender]
+
+    def _create_synthesizer(self, voice_name):
+        speech_config = speechsdk.SpeechConfig(
+            subscription=self.subscription, region=self.region
+        )
+        speech_config.speech_synthesis_voice_name = voice_name
+        speech_config.set_speech_synthesis_output_format(AUDIO_FORMAT)
+        # No audio config: audio is only returned to us, never played or written to a file.
+        return speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+    async def _acquire(self, voice_name):
+        async with self._lock:
+            idle = self._idle.setdefault(voice_name, asyncio.Queue())
+            if idle.empty() and self._created.get(voice_name, 0) < self.per_voice:
+                self._created[voice_name] = self._created.get(voice_name, 0) + 1
+                try:
+                    return self._create_synthesizer(voice_name)
+                except Exception:
+                    # Free the slot, or callers would wait for a synthesizer that never arrives
+                    self._created[voice_name] -= 1
+                    raise
+        return await idle.get()
+
+    def _release(self, voice_name, synthesizer):
+        self._idle[voice_name].put_nowait(synthesizer)
+
+    async def stream(self, text, language, gender="Male"):
+        """Yields raw 24 kHz 16-bit mono PCM chunks as soon as Azure produces them."""
+        voice_name = self.voice_name(language, gender)
+        synthesizer = await self._acquire(voice_name)
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                result = synthesizer.start_speaking_text_async(text).get()
+                if result.reason == speechsdk.ResultReason.Canceled:
+                    return
+                stream = speechsdk.AudioDataStream(result)
+                buffer = bytes(CHUNK_SIZE)
+                pending = b""
+                while not stopped.is_set():
+                    filled = stream.read_data(buffer)
+                    if filled == 0:
+                        break
+                    data = pending + buffer[:filled]
+                    # Keep chunks aligned to whole 16-bit samples.
+                    split = len(data) - len(data) % 2
+                    pending = data[split:]
+                    loop.call_soon_threadsafe(chunks.put_nowait, data[:split])
+                if stopped.is_set():
+                    synthesizer.stop_speaking_async().get()
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            stopped.set()
+            try:
+                await producer
+            finally:
+                self._release(voice_name, synthesizer)
+
+    async def synthesize(self, text, language, gender="Male"):
+        """Returns the full utterance as PCM bytes, or None if synthesis produced nothing."""
+        audio = bytearray()
+        async for chunk in self.stream(text, language, gender):
+            audio += chunk
+        return bytes(audio) or None
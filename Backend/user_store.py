@@ -0,0 +1,120 @@
+import copy
+import datetime
+import itertools
+import os
+
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class UserStore:
+    """
+    Async access to users and their one-time passwords.
+    OTPs live in their own collection with a TTL index on created_at, so
+    expired codes are removed by the database and never verify.
+    """
+
+    def __init__(self, db, otp_ttl=OTP_TTL_SECONDS):
+        self.users = db.users
+        self.otps = db.otps
+        self.otp_ttl = otp_ttl
+
+    async def ensure_indexes(self):
+        await self.users.create_index([("no", 1)])
+        await self.otps.create_index([("no", 1), ("created_at", -1)])
+        await self.otps.create_index("created_at", expireAfterSeconds=self.otp_ttl)
+
+    async def register(self, name, email, no, gender, otp):
+        await self.users.insert_one(
+            {
+                "name": name,
+                "email": email,
+                "no": no,
+                "gender": gender,
+                "verified": False,
+                "role": "user",
+            }
+        )
+        await self.otps.insert_one({"no": no, "otp": otp, "created_at": utcnow()})
+
+    async def verify(self, no, otp):
+        """Marks the user verified if otp matches their latest unexpired code."""
+        latest = await self.otps.find_one({"no": no}, sort=[("created_at", -1)])
+        if latest is None or latest["otp"] != otp:
+            return False
+        created_at = latest["created_at"]
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+        # The TTL monitor only runs once a minute, so check expiry here as well.
+        if (utcnow() - created_at).total_seconds() > self.otp_ttl:
+            return False
+        await self.users.update_many({"no": no}, {"$set": {"verified": True}})
+        await self.otps.delete_many({"no": no})
+        return True
+
+
+class InMemoryCollection:
+    """Async stand-in for the subset of the Mongo collection API used by UserStore."""
+
+    def __init__(self):
+        self.documents = []
+        self.indexes = []
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _matches(document, query):
+        return all(document.get(key) == value for key, value in query.items())
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return str(keys)
+
+    async def insert_one(self, document):
+        document.setdefault("_id", next(self._ids))
+        self.documents.append(copy.deepcopy(document))
+
+    async def find_one(self, query, sort=None):
+        matches = [d for d in self.documents if self._matches(d, query)]
+        for key, direction in reversed(sort or []):
+            matches.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return copy.deepcopy(matches[0]) if matches else None
+
+    async def update_many(self, query, update):
+        for document in self.documents:
+            if self._matches(document, query):
+                document.update(copy.deepcopy(update.get("$set", {})))
+
+    async def delete_many(self, query):
+        self.documents = [d for d in self.documents if not self._matches(d, query)]
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.users = InMemoryCollection()
+        self.otps = InMemoryCollection()
+
+
+def create_user_store(uri):
+    """
+    Builds a UserStore for MONGO_URI. "memory://" (or no URI) gives an
+    in-process stand-in for local runs and tests; anything else uses the
+    async Mongo driver with a pool sized by MONGO_MAX_POOL_SIZE and
+    MONGO_MIN_POOL_SIZE.
+    """
+    if not uri or uri.startswith("memory://"):
+        return UserStore(InMemoryDatabase())
+
+    from pymongo import AsyncMongoClient
+
+    client = AsyncMongoClient(
+        uri,
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+        maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        tz_aware=True,
+    )
+    return UserStore(client.estate_agent)
@@ -0,0 +1,62 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ConcurrencyLimiter:
+    """Async context manager that caps concurrent work and counts how many callers are waiting."""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.max_waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+        }
+
+
+class BoundedExecutor:
+    """Runs blocking functions in a thread pool, at most max_workers at a time, without blocking the event loop."""
+
+    def __init__(self, name, max_workers=4):
+        self.name = name
+        self.limiter = ConcurrencyLimiter(name, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        async with self.limiter:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+
+    def stats(self):
+        return self.limiter.stats()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)